@@ -0,0 +1,39 @@
+"""
+pytest-benchmark variant of run.py, for quick regression checks:
+
+    pytest benchmarks/bench_io.py --benchmark-json=results.json
+"""
+
+import os
+
+import pytest
+
+from run import cases
+from synthetic import create_mesh
+
+pytest.importorskip("pytest_benchmark")
+
+sizes = [10**4, 10**5]
+
+
+@pytest.fixture(scope="module", params=sizes)
+def mesh(request):
+    return create_mesh(request.param, num_point_fields=3, num_cell_fields=2)
+
+
+@pytest.mark.parametrize("case", list(cases))
+def test_write(benchmark, tmp_path, mesh, case):
+    ext, writer, _ = cases[case]
+    filename = str(tmp_path / f"mesh{ext}")
+    benchmark(writer, filename, mesh)
+    benchmark.extra_info["file_size"] = os.path.getsize(filename)
+
+
+@pytest.mark.parametrize(
+    "case,mode", [(case, mode) for case in cases for mode in cases[case][2]]
+)
+def test_read(benchmark, tmp_path, mesh, case, mode):
+    ext, writer, readers = cases[case]
+    filename = str(tmp_path / f"mesh{ext}")
+    writer(filename, mesh)
+    benchmark(readers[mode], filename)
@@ -0,0 +1,224 @@
+"""
+Benchmark HMF I/O against other meshio formats.
+
+    python3 benchmarks/run.py --sizes 1e4 1e5 1e6 --output results.json
+
+Every write and every read runs in a fresh process so that the peak RSS can be
+attributed to it. Results are written as JSON for tracking over time.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy
+
+import hmf
+import meshio
+from synthetic import create_mesh
+
+
+def _write_hmf(**kwargs):
+    def write(filename, mesh):
+        hmf.write(filename, mesh, **kwargs)
+
+    return write
+
+
+def _read_hmf_lazy(filename):
+    with hmf.open(filename) as f:
+        name = next(iter(f.point_data), None)
+        return f.num_points if name is None else f.point_data[name].read()
+
+
+def _read_hmf_partial(filename):
+    with hmf.open(filename) as f:
+        cell_type = list(f.cells)[-1]
+        names = list(f.point_data)[:1]
+    return hmf.read(filename, cell_types=[cell_type], point_data=names, cell_data=[])
+
+
+hmf_readers = {
+    "full": hmf.read,
+    "lazy": _read_hmf_lazy,
+    "partial": _read_hmf_partial,
+}
+
+# name: (file extension, writer, readers)
+cases = {
+    "hmf-gzip": (".hmf", _write_hmf(compression="gzip"), hmf_readers),
+    "hmf-lzf": (".hmf", _write_hmf(compression="lzf"), hmf_readers),
+    "hmf-none": (".hmf", _write_hmf(compression=None), hmf_readers),
+    "xdmf": (".xdmf", meshio.write, {"full": meshio.read}),
+    "xdmf-gzip": (
+        ".xdmf",
+        lambda filename, mesh: meshio.xdmf.write(filename, mesh, compression="gzip"),
+        {"full": meshio.read},
+    ),
+    "vtu": (".vtu", meshio.write, {"full": meshio.read}),
+}
+
+
+def _peak_rss():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _file_size(filename):
+    size = os.path.getsize(filename)
+    if filename.endswith(".xdmf"):
+        h5_filename = os.path.splitext(filename)[0] + ".h5"
+        if os.path.exists(h5_filename):
+            size += os.path.getsize(h5_filename)
+    return size
+
+
+def _measure_write(case, filename, n_cells, num_point_fields, num_cell_fields):
+    mesh = create_mesh(n_cells, num_point_fields, num_cell_fields)
+    rss_mesh = _peak_rss()
+    writer = cases[case][1]
+    t = time.perf_counter()
+    writer(filename, mesh)
+    t = time.perf_counter() - t
+    return {
+        "num_points": len(mesh.points),
+        "num_cells": sum(len(c) for c in mesh.cells.values()),
+        "write_time": t,
+        "write_peak_rss": _peak_rss(),
+        # peak RSS caused by the writer on top of the mesh itself
+        "write_extra_rss": _peak_rss() - rss_mesh,
+        "file_size": _file_size(filename),
+    }
+
+
+def _measure_read(case, mode, filename):
+    reader = cases[case][2][mode]
+    rss = _peak_rss()
+    t = time.perf_counter()
+    reader(filename)
+    t = time.perf_counter() - t
+    return {
+        "read_time": t,
+        "read_peak_rss": _peak_rss(),
+        "read_extra_rss": _peak_rss() - rss,
+    }
+
+
+def _in_subprocess(fun, *args):
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=ctx) as executor:
+        return executor.submit(fun, *args).result()
+
+
+def run(sizes, case_names, num_point_fields, num_cell_fields, repeat, tmpdir):
+    results = []
+    for n_cells in sizes:
+        for case in case_names:
+            ext, _, readers = cases[case]
+            filename = os.path.join(tmpdir, f"mesh{ext}")
+            for _ in range(repeat):
+                try:
+                    w = _in_subprocess(
+                        _measure_write,
+                        case,
+                        filename,
+                        n_cells,
+                        num_point_fields,
+                        num_cell_fields,
+                    )
+                except Exception as e:
+                    # e.g., missing optional dependencies of a meshio writer
+                    print(f"{case:>10}: {e!r}")
+                    results.append(
+                        {"case": case, "target_cells": n_cells, "error": repr(e)}
+                    )
+                    break
+                for mode in readers:
+                    r = _in_subprocess(_measure_read, case, mode, filename)
+                    record = {"case": case, "mode": mode, "target_cells": n_cells}
+                    record.update(w)
+                    record.update(r)
+                    results.append(record)
+                    _print_record(record)
+    return results
+
+
+def _print_record(r):
+    print(
+        f"{r['case']:>10} {r['mode']:>8} {r['num_cells']:>10} cells  "
+        f"write {r['write_time']:8.3f} s  read {r['read_time']:8.3f} s  "
+        f"size {r['file_size'] / 2 ** 20:9.2f} MB  "
+        f"read rss {r['read_peak_rss'] / 2 ** 20:9.1f} MB"
+    )
+
+
+def _metadata():
+    return {
+        "date": datetime.datetime.utcnow().isoformat(),
+        "hmf": hmf.__version__,
+        "meshio": meshio.__version__,
+        "h5py": h5py.__version__,
+        "hdf5": h5py.version.hdf5_version,
+        "numpy": numpy.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HMF I/O.")
+    parser.add_argument(
+        "--sizes",
+        type=float,
+        nargs="+",
+        default=[1.0e4, 1.0e5, 1.0e6],
+        help="approximate number of cells (default: 1e4 1e5 1e6)",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=list(cases.keys()),
+        default=list(cases.keys()),
+        help="formats to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "--point-fields", type=int, default=3, help="number of point fields"
+    )
+    parser.add_argument(
+        "--cell-fields", type=int, default=2, help="number of cell fields"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="repetitions per case")
+    parser.add_argument(
+        "--tmpdir", default=None, help="directory for the mesh files (default: system)"
+    )
+    parser.add_argument("--output", "-o", default=None, help="JSON output file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.tmpdir) as tmpdir:
+        results = run(
+            [int(n) for n in args.sizes],
+            args.cases,
+            args.point_fields,
+            args.cell_fields,
+            args.repeat,
+            tmpdir,
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"metadata": _metadata(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy
+
+import meshio
+
+
+def create_mesh(n_cells, num_point_fields=1, num_cell_fields=0):
+    # Structured box of n^3 cubes, each split into six tetrahedra, plus the triangles of
+    # the bottom face and the lines along one edge. Smooth fields compress like
+    # simulation output would.
+    n = max(1, int(round((n_cells / 6) ** (1 / 3))))
+    x = numpy.linspace(0.0, 1.0, n + 1)
+    points = numpy.stack(numpy.meshgrid(x, x, x, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    idx = numpy.arange((n + 1) ** 3).reshape(n + 1, n + 1, n + 1)
+    corners = numpy.stack(
+        [
+            idx[:-1, :-1, :-1],
+            idx[1:, :-1, :-1],
+            idx[1:, 1:, :-1],
+            idx[:-1, 1:, :-1],
+            idx[:-1, :-1, 1:],
+            idx[1:, :-1, 1:],
+            idx[1:, 1:, 1:],
+            idx[:-1, 1:, 1:],
+        ],
+        axis=-1,
+    ).reshape(-1, 8)
+    # Kuhn triangulation around the diagonal 0-6
+    tetra = numpy.concatenate(
+        [
+            corners[:, [0, 1, 2, 6]],
+            corners[:, [0, 2, 3, 6]],
+            corners[:, [0, 3, 7, 6]],
+            corners[:, [0, 7, 4, 6]],
+            corners[:, [0, 4, 5, 6]],
+            corners[:, [0, 5, 1, 6]],
+        ]
+    )
+    bottom = corners[: n * n * n : n][:, [0, 1, 2, 3]]
+    triangle = numpy.concatenate([bottom[:, [0, 1, 2]], bottom[:, [0, 2, 3]]])
+    line = numpy.column_stack([idx[:-1, 0, 0], idx[1:, 0, 0]])
+    cells = {"line": line, "triangle": triangle, "tetra": tetra}
+
+    point_data = {}
+    for k in range(num_point_fields):
+        point_data[f"p{k}"] = numpy.sin((k + 1) * numpy.pi * points).prod(axis=1)
+
+    cell_data = {key: {} for key in cells}
+    for k in range(num_cell_fields):
+        for key, value in cells.items():
+            centroids = points[value].mean(axis=1)
+            cell_data[key][f"c{k}"] = numpy.cos((k + 1) * centroids).sum(axis=1)
+
+    return meshio.Mesh(points, cells, point_data=point_data, cell_data=cell_data)
@@ -1,11 +1,49 @@
 from . import _cli
 from .__about__ import __author__, __email__, __version__, __website__
-from ._main import read, write, write_points_cells
+from ._cache import ReadCache
+from ._file import HmfFile, LazyArray, open
+from ._iter import iter_cell_data, iter_cells, iter_point_data
+from ._main import (
+    list_grids,
+    read,
+    read_grids,
+    write,
+    write_grids,
+    write_points_cells,
+)
+from ._mpi import read_parallel, write_parallel
+from ._region import read_region
+from ._reorder import reorder
+from ._repack import repack, repack_many
+from ._time_series import TimeSeriesReader, TimeSeriesWriter
+from ._validate import ValidationReport, validate
+from ._writer import StreamWriter
 
 __all__ = [
+    "open",
+    "HmfFile",
+    "LazyArray",
     "read",
+    "read_grids",
+    "read_region",
+    "list_grids",
+    "ReadCache",
+    "iter_cells",
+    "iter_cell_data",
+    "iter_point_data",
     "write",
     "write_points_cells",
+    "write_grids",
+    "reorder",
+    "read_parallel",
+    "write_parallel",
+    "repack",
+    "repack_many",
+    "TimeSeriesWriter",
+    "TimeSeriesReader",
+    "StreamWriter",
+    "validate",
+    "ValidationReport",
     "_cli",
     "__author__",
     "__email__",
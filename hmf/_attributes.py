@@ -0,0 +1,126 @@
+import collections.abc
+
+import numpy
+
+# Fields are stored as grid/Attributes/Attribute{k}, each with the attributes Name and
+# Center. grid/Attributes/Index lists them so that readers find a field by name with
+# a single read. Older files have a single grid/Attribute dataset.
+
+
+def attribute_group(grid):
+    return grid.require_group("Attributes")
+
+
+def next_attribute_key(group):
+    return f"Attribute{sum(1 for key in group if key != 'Index')}"
+
+
+def _datasets(group):
+    # in the order they were written; h5py sorts Attribute10 before Attribute2
+    keys = sorted((key for key in group if key != "Index"), key=lambda k: int(k[9:]))
+    return [(key, group[key]) for key in keys]
+
+
+def write_attribute(group, key, name, center, data, policy):
+    att = policy.create_dataset(group, key, "Attribute", data, encode=True)
+    att.attrs["Name"] = name
+    att.attrs["Center"] = center
+    return att
+
+
+def add_attribute(grid, name, center, data, policy):
+    group = attribute_group(grid)
+    return write_attribute(group, next_attribute_key(group), name, center, data, policy)
+
+
+def create_attribute(grid, name, center, shape, dtype, **kwargs):
+    # for writers that fill the dataset later; kwargs go to create_dataset
+    group = attribute_group(grid)
+    att = group.create_dataset(next_attribute_key(group), shape, dtype=dtype, **kwargs)
+    att.attrs["Name"] = name
+    att.attrs["Center"] = center
+    return att
+
+
+def write_index(grid):
+    # Call once all fields are written. Fixed-length strings, since parallel HDF5
+    # can't write variable-length data.
+    if "Attributes" not in grid:
+        return
+    group = grid["Attributes"]
+    if "Index" in group:
+        del group["Index"]
+    rows = []
+    for key, value in _datasets(group):
+        shape = ",".join(str(s) for s in value.shape)
+        rows.append(
+            (
+                value.attrs["Name"].encode(),
+                value.attrs["Center"].encode(),
+                key.encode(),
+                shape.encode(),
+                value.dtype.str.encode(),
+            )
+        )
+    fields = ["name", "center", "key", "shape", "dtype"]
+    dtype = [
+        (field, f"S{max([1] + [len(row[k]) for row in rows])}")
+        for k, field in enumerate(fields)
+    ]
+    group.create_dataset("Index", data=numpy.array(rows, dtype=dtype))
+
+
+def read_index(group):
+    # list of (name, center, key, shape, dtype)
+    out = []
+    for row in group["Index"][()]:
+        shape = row["shape"].decode()
+        out.append(
+            (
+                row["name"].decode(),
+                row["center"].decode(),
+                row["key"].decode(),
+                tuple(int(s) for s in shape.split(",")) if shape else (),
+                numpy.dtype(row["dtype"].decode()),
+            )
+        )
+    return out
+
+
+class FieldMap(collections.abc.Mapping):
+    """Fields by name; the datasets are only opened when accessed, and wrapped with
+    `wrap` (e.g., LazyArray).
+    """
+
+    def __init__(self, group, keys, wrap):
+        self._group = group
+        self._keys = keys
+        self._wrap = wrap
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = self._wrap(self._group[self._keys[name]])
+        return self._arrays[name]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __repr__(self):
+        return f"<hmf.FieldMap {list(self._keys)}>"
+
+
+def field_maps(group, wrap):
+    # point data and cell data of grid/Attributes as FieldMaps
+    keys = {"Node": {}, "Cell": {}}
+    if "Index" in group:
+        for name, center, key, _, _ in read_index(group):
+            keys[center][name] = key
+    else:
+        # index missing, e.g., if a writer was interrupted, or in time steps
+        for key, value in _datasets(group):
+            keys[value.attrs["Center"]][value.attrs["Name"]] = key
+    return FieldMap(group, keys["Node"], wrap), FieldMap(group, keys["Cell"], wrap)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from ._file import HmfFile
+
+
+def _default_directory():
+    if "HMF_CACHE_DIR" in os.environ:
+        return os.environ["HMF_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache"))
+    return os.path.join(os.path.expanduser(base), "hmf")
+
+
+def _file_key(filename, num_samples=16, sample_bytes=2**16):
+    # Path, mtime and size catch almost all changes; a hash of a few evenly spaced
+    # samples of the content catches the rest without reading the whole file.
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{filename}\0{stat.st_mtime_ns}\0{stat.st_size}".encode())
+    with open(filename, "rb") as f:
+        step = max(sample_bytes, stat.st_size // num_samples)
+        for offset in range(0, stat.st_size, step):
+            f.seek(offset)
+            h.update(f.read(sample_bytes))
+    return h.hexdigest()
+
+
+class ReadCache:
+    """Keeps the decompressed arrays of HMF files as .npy files in `directory` and
+    memory-maps them on later reads. Least recently used entries are removed when the
+    cache grows beyond `max_bytes`.
+
+    The directory defaults to $HMF_CACHE_DIR or ~/.cache/hmf.
+    """
+
+    def __init__(self, directory=None, max_bytes=2**32):
+        self.directory = _default_directory() if directory is None else directory
+        self.max_bytes = max_bytes
+
+    def open(self, filename, workers=None, restore_dtype=True, grid=None, level=0):
+        # HmfFile-like object with memory-mapped numpy arrays
+        key = _file_key(filename)
+        if grid is not None:
+            key += "-" + hashlib.blake2b(grid.encode(), digest_size=8).hexdigest()
+        if level != 0:
+            key += f"-level{level}"
+        if not restore_dtype:
+            key += "-stored"
+        entry = os.path.join(self.directory, key)
+        if not os.path.isdir(entry):
+            if not self._add(filename, entry, workers, restore_dtype, grid, level):
+                return None
+            self.evict(keep=key)
+        # mark as recently used
+        os.utime(os.path.join(entry, "meta.json"))
+        return _CachedFile(filename, entry)
+
+    def read(
+        self, filename, workers=None, restore_dtype=True, grid=None, level=0, **kwargs
+    ):
+        file_kwargs = {
+            "workers": workers,
+            "restore_dtype": restore_dtype,
+            "grid": grid,
+            "level": level,
+        }
+        f = self.open(filename, **file_kwargs)
+        if f is None:
+            # too large for the cache
+            with HmfFile(filename, **file_kwargs) as f:
+                return f.read(**kwargs)
+        return f.read(**kwargs)
+
+    def _add(self, filename, entry, workers, restore_dtype, grid, level):
+        os.makedirs(self.directory, exist_ok=True)
+        with HmfFile(
+            filename,
+            workers=workers,
+            restore_dtype=restore_dtype,
+            grid=grid,
+            level=level,
+        ) as f:
+            arrays = [("points", f.points)]
+            arrays += [(f"cells/{key}", value) for key, value in f.cells.items()]
+            arrays += [(f"point_data/{k}", v) for k, v in f.point_data.items()]
+            arrays += [(f"cell_data/{k}", v) for k, v in f.cell_data_raw.items()]
+            if sum(value.nbytes for _, value in arrays) > self.max_bytes:
+                return False
+
+            # Fill a temporary directory and rename it; concurrent readers either see
+            # the complete entry or none.
+            tmp = tempfile.mkdtemp(suffix=".tmp", dir=self.directory)
+            try:
+                meta = []
+                for k, (name, value) in enumerate(arrays):
+                    out = numpy.lib.format.open_memmap(
+                        os.path.join(tmp, f"{k}.npy"),
+                        mode="w+",
+                        dtype=value.dtype,
+                        shape=value.shape,
+                    )
+                    for s in value.blocks():
+                        out[s] = value[s]
+                    out.flush()
+                    del out
+                    meta.append([name, f"{k}.npy"])
+                with open(os.path.join(tmp, "meta.json"), "w") as fh:
+                    json.dump(meta, fh)
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            # fine if another process was faster
+            if not os.path.isdir(entry):
+                raise
+        return True
+
+    def _entries(self):
+        # (last use, size, path) of all complete entries
+        out = []
+        if not os.path.isdir(self.directory):
+            return out
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta = os.path.join(path, "meta.json")
+            if name.endswith(".tmp") or not os.path.isfile(meta):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, fn)) for fn in os.listdir(path)
+            )
+            out.append((os.path.getmtime(meta), size, path))
+        return out
+
+    @property
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep=None):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class _CachedFile(HmfFile):
+    def __init__(self, filename, entry):
+        self._filename = filename
+        with open(os.path.join(entry, "meta.json")) as fh:
+            meta = json.load(fh)
+
+        self.points = None
+        self.cells = {}
+        self.point_data = {}
+        self.cell_data_raw = {}
+        self.field_data = {}
+        for name, fn in meta:
+            # copy-on-write so that the returned arrays can be modified
+            value = numpy.load(os.path.join(entry, fn), mmap_mode="c")
+            if name == "points":
+                self.points = value
+            else:
+                kind, key = name.split("/", 1)
+                {
+                    "cells": self.cells,
+                    "point_data": self.point_data,
+                    "cell_data": self.cell_data_raw,
+                }[kind][key] = value
+
+    def close(self):
+        pass
+
+    @property
+    def filename(self):
+        return self._filename
@@ -0,0 +1,136 @@
+import concurrent.futures
+import os
+import zlib
+
+import h5py
+import numpy
+
+# filters that can be decoded here, without the HDF5 library. Fletcher32 is left to
+# HDF5, which verifies the checksums.
+_decoders = {
+    h5py.h5z.FILTER_DEFLATE: lambda data, itemsize: zlib.decompress(data),
+    h5py.h5z.FILTER_SHUFFLE: lambda data, itemsize: _unshuffle(data, itemsize),
+}
+
+
+def _unshuffle(data, itemsize):
+    a = numpy.frombuffer(data, dtype=numpy.uint8)
+    n = len(a) // itemsize
+    out = numpy.empty(len(a), dtype=numpy.uint8)
+    out[: n * itemsize] = a[: n * itemsize].reshape(itemsize, n).T.ravel()
+    # HDF5 leaves trailing bytes as they are
+    out[n * itemsize :] = a[n * itemsize :]
+    return out
+
+
+def can_read_parallel(dataset):
+    # os.pread is missing on Windows
+    if not hasattr(os, "pread"):
+        return False
+    if dataset.chunks is None or dataset.file.driver != "sec2":
+        return False
+    plist = dataset.id.get_create_plist()
+    filters = [plist.get_filter(k)[0] for k in range(plist.get_nfilters())]
+    return len(filters) > 0 and all(f in _decoders for f in filters)
+
+
+def use_threads(dataset, start, stop, workers):
+    # Threads only pay off with several cores and several chunks.
+    if workers is None or min(workers, os.cpu_count() or 1) <= 1:
+        return False
+    if dataset.chunks is None:
+        return False
+    return _num_chunks(dataset.shape, dataset.chunks, start, stop) > 1
+
+
+class ChunkMap:
+    """File offsets, sizes and filter masks of the chunks of a dataset, sorted by
+    their first row. Build once per dataset; listing the chunks is expensive.
+    """
+
+    def __init__(self, dataset):
+        infos = []
+        if hasattr(dataset.id, "chunk_iter"):
+            dataset.id.chunk_iter(infos.append)
+        else:
+            infos = [
+                dataset.id.get_chunk_info(k) for k in range(dataset.id.get_num_chunks())
+            ]
+        infos.sort(key=lambda info: info.chunk_offset)
+        self.infos = infos
+        self.rows = numpy.array([info.chunk_offset[0] for info in infos], dtype=int)
+
+    def select(self, start, stop, chunk_rows):
+        # the chunks that intersect rows [start, stop)
+        a = numpy.searchsorted(self.rows, start - chunk_rows, side="right")
+        b = numpy.searchsorted(self.rows, stop, side="left")
+        return [
+            info
+            for info in self.infos[a:b]
+            if info.chunk_offset[0] + chunk_rows > start
+        ]
+
+
+def read_rows(dataset, start, stop, workers, chunk_map=None):
+    """Read dataset[start:stop] by decompressing the chunks in a thread pool.
+
+    The raw chunks are read from the file with os.pread and inflated with zlib, both
+    of which release the GIL; h5py is only used to locate the chunks. Pass a ChunkMap
+    of the dataset to avoid listing the chunks on every call. Where threads don't pay
+    off (see use_threads), HDF5 reads the rows.
+    """
+    if not use_threads(dataset, start, stop, workers):
+        return dataset[start:stop]
+    workers = min(workers, os.cpu_count())
+    chunks = dataset.chunks
+
+    plist = dataset.id.get_create_plist()
+    filters = [plist.get_filter(k)[0] for k in range(plist.get_nfilters())]
+    itemsize = dataset.dtype.itemsize
+
+    if chunk_map is None:
+        chunk_map = ChunkMap(dataset)
+    infos = chunk_map.select(start, stop, chunks[0])
+
+    if len(infos) < _num_chunks(dataset.shape, chunks, start, stop):
+        # Some chunks were never written and hold the fill value; rare enough to leave
+        # it to HDF5.
+        return dataset[start:stop]
+
+    out = numpy.empty((stop - start,) + dataset.shape[1:], dtype=dataset.dtype)
+
+    def decode(info):
+        data = os.pread(fd, info.size, info.byte_offset)
+        for k in reversed(range(len(filters))):
+            if not info.filter_mask & (1 << k):
+                data = _decoders[filters[k]](data, itemsize)
+        chunk = numpy.frombuffer(data, dtype=dataset.dtype).reshape(chunks)
+
+        # intersection of the chunk with the requested rows
+        src = []
+        dst = []
+        for axis, (offset, size) in enumerate(zip(info.chunk_offset, chunks)):
+            lo, hi = offset, min(offset + size, dataset.shape[axis])
+            if axis == 0:
+                lo, hi = max(lo, start), min(hi, stop)
+                dst.append(slice(lo - start, hi - start))
+            else:
+                dst.append(slice(lo, hi))
+            src.append(slice(lo - offset, hi - offset))
+        out[tuple(dst)] = chunk[tuple(src)]
+
+    fd = os.open(dataset.file.filename, os.O_RDONLY)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            # list() to raise exceptions from the workers
+            list(executor.map(decode, infos))
+    finally:
+        os.close(fd)
+    return out
+
+
+def _num_chunks(shape, chunks, start, stop):
+    n = (stop - 1) // chunks[0] - start // chunks[0] + 1 if stop > start else 0
+    for size, chunk in zip(shape[1:], chunks[1:]):
+        n *= -(-size // chunk)
+    return n
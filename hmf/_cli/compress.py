@@ -1,7 +1,7 @@
 import argparse
 
-from .._main import read as hmf_read
-from .._main import write as hmf_write
+from .._repack import repack_many
+from .._storage import plugin_compressions
 from .common import _get_version_text
 
 
@@ -9,27 +9,101 @@ def compress(argv=None):
     # Parse command line arguments.
     parser = _get_parser()
     args = parser.parse_args(argv)
-    mesh = hmf_read(args.file)
-    hmf_write(
-        args.file, mesh, compression="gzip", compression_opts=args.compression_level
+    level = args.compression_level
+    if level is None and args.compression == "gzip":
+        level = 4
+    errors = repack_many(
+        args.files,
+        max_workers=args.jobs,
+        compression=args.compression,
+        compression_opts=level,
+        shuffle=args.shuffle,
+        chunks=None if args.chunk_size is None else args.chunk_size * 1024,
+        index_dtype=args.index_dtype,
+        float_dtype=args.float_dtype,
     )
+    return _report_errors(errors)
+
+
+def _report_errors(errors):
+    num_errors = 0
+    for filename, e in errors.items():
+        if e is not None:
+            print(f"{filename}: {e}")
+            num_errors += 1
+    return 1 if num_errors > 0 else 0
 
 
 def _get_parser():
     parser = argparse.ArgumentParser(
-        description=("Uncompress hmf file."),
+        description=("Compress hmf files."),
         formatter_class=argparse.RawTextHelpFormatter,
     )
 
-    parser.add_argument("file", type=str, help="hmf mesh file to compress")
+    parser.add_argument("files", type=str, nargs="+", help="hmf mesh files to compress")
+
+    parser.add_argument(
+        "--compression",
+        "-t",
+        type=str,
+        choices=["gzip", "lzf"] + plugin_compressions,
+        default="gzip",
+        help="compression filter; "
+        + ", ".join(plugin_compressions)
+        + " need hdf5plugin (default: gzip)",
+    )
 
     parser.add_argument(
         "--compression-level",
         "-c",
         type=int,
-        choices=list(range(10)),
-        default=4,
-        help="compression level (default: 4)",
+        default=None,
+        help="compression level (default: 4 for gzip, filter default otherwise)",
+    )
+
+    parser.add_argument(
+        "--no-shuffle",
+        dest="shuffle",
+        action="store_false",
+        default=None,
+        help="don't apply the byte-shuffle filter before compressing",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        "-s",
+        type=int,
+        metavar="KB",
+        default=None,
+        help="target chunk size in kB (default: 1024 for Geometry and Attribute,\n"
+        "4096 for Topology)",
+    )
+
+    parser.add_argument(
+        "--keep-index-dtype",
+        dest="index_dtype",
+        action="store_const",
+        const=None,
+        default="auto",
+        help="don't store the cell connectivity with the smallest unsigned integer\n"
+        "type that holds all point indices",
+    )
+
+    parser.add_argument(
+        "--float32",
+        dest="float_dtype",
+        action="store_const",
+        const="float32",
+        default=None,
+        help="store points and floating-point data in single precision",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of files to process in parallel (default: number of CPUs)",
     )
 
     parser.add_argument(
@@ -1,30 +1,64 @@
 import argparse
+import concurrent.futures
+import glob
 import os
+import time
 
 import numpy
 
 from meshio._helpers import _writer_map, read, reader_map, write
 
+from .._convert import NotStreamable, hmf_to_xdmf, xdmf_to_hmf
 from .._main import read as hmf_read
 from .._main import write as hmf_write
+from .._reorder import reorder as hmf_reorder
+from .._repack import repack
 from .common import _get_version_text
+from .compress import _report_errors
+from .info import _format_bytes
 
 
 def convert(argv=None):
     # Parse command line arguments.
     parser = _get_convert_parser()
     args = parser.parse_args(argv)
+    if args.encoding == "quantize" and args.tolerance is None:
+        parser.error("--encoding quantize needs --tolerance")
+
+    if args.output_dir is None and args.output_pattern is None:
+        if len(args.files) != 2:
+            parser.error("expected one input and one output file, or --output-dir")
+        _convert_file(args.files[0], args.files[1], args)
+        return 0
+
+    return _convert_batch(_batch_jobs(args), args)
+
+
+def _convert_file(infile, outfile, args):
+    # Where possible, copy the data block by block instead of going through a full
+    # meshio.Mesh.
+    if (
+        not args.prune
+        and args.reorder is None
+        and args.lod == 0
+        and args.encoding is None
+    ):
+        try:
+            if _convert_streaming(infile, outfile, args):
+                return
+        except NotStreamable:
+            pass
 
     # read mesh data
     if args.input_format is None:
-        is_hmf = os.path.splitext(args.infile)[-1] == ".hmf"
+        is_hmf = os.path.splitext(infile)[-1] == ".hmf"
     else:
         is_hmf = args.input_format.lower() == "hmf"
 
     if is_hmf:
-        mesh = hmf_read(args.infile)
+        mesh = hmf_read(infile, workers=args.workers)
     else:
-        mesh = read(args.infile, file_format=args.input_format)
+        mesh = read(infile, file_format=args.input_format)
 
     if args.prune:
         mesh.prune()
@@ -41,14 +75,134 @@ def convert(argv=None):
 
     # write it out
     if args.output_format is None:
-        is_hmf = os.path.splitext(args.outfile)[-1] == ".hmf"
+        is_hmf = os.path.splitext(outfile)[-1] == ".hmf"
     else:
         is_hmf = args.output_format.lower() == "hmf"
 
     if is_hmf:
-        hmf_write(args.outfile, mesh)
+        hmf_write(
+            outfile,
+            mesh,
+            index_dtype=args.index_dtype,
+            float_dtype=args.float_dtype,
+            reorder=args.reorder,
+            store_permutation=args.store_permutation,
+            lod=args.lod,
+            encoding=args.encoding,
+            tolerance=args.tolerance,
+        )
+    else:
+        if args.reorder is not None:
+            mesh, _, _ = hmf_reorder(mesh, args.reorder)
+        write(outfile, mesh, file_format=args.output_format)
+
+
+def _batch_jobs(args):
+    # (infile, outfile) pairs; patterns are expanded here as well for shells that
+    # don't do it
+    infiles = []
+    for name in args.files:
+        infiles += sorted(glob.glob(name)) if glob.has_magic(name) else [name]
+
+    pattern = "{stem}.hmf" if args.output_pattern is None else args.output_pattern
+    jobs = []
+    for infile in infiles:
+        name = os.path.basename(infile)
+        outfile = pattern.format(
+            name=name,
+            stem=os.path.splitext(name)[0],
+            dir=os.path.dirname(infile) or ".",
+        )
+        if args.output_dir is not None:
+            outfile = os.path.join(args.output_dir, outfile)
+        jobs.append((infile, outfile))
+    return jobs
+
+
+def _is_up_to_date(infile, outfile):
+    return (
+        os.path.exists(infile)
+        and os.path.exists(outfile)
+        and os.path.getmtime(outfile) >= os.path.getmtime(infile)
+    )
+
+
+def _try_convert(infile, outfile, args):
+    try:
+        os.makedirs(os.path.dirname(outfile) or ".", exist_ok=True)
+        _convert_file(infile, outfile, args)
+    except Exception as e:
+        return e
+    return None
+
+
+def _convert_batch(jobs, args):
+    todo = [job for job in jobs if args.force or not _is_up_to_date(*job)]
+
+    start = time.perf_counter()
+    if args.jobs == 1:
+        results = [_try_convert(infile, outfile, args) for infile, outfile in todo]
     else:
-        write(args.outfile, mesh, file_format=args.output_format)
+        with concurrent.futures.ProcessPoolExecutor(args.jobs) as executor:
+            futures = [
+                executor.submit(_try_convert, infile, outfile, args)
+                for infile, outfile in todo
+            ]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    errors = {infile: e for (infile, _), e in zip(todo, results)}
+    converted = [infile for infile, e in errors.items() if e is None]
+    num_bytes = sum(os.path.getsize(infile) for infile in converted)
+    code = _report_errors(errors)
+    rate = num_bytes / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Converted {len(converted)} files ({_format_bytes(num_bytes)}) "
+        f"in {elapsed:.1f} s ({_format_bytes(rate)}/s), "
+        f"skipped {len(jobs) - len(todo)} up to date, "
+        f"{len(todo) - len(converted)} failed"
+    )
+    return code
+
+
+def _file_format(filename, file_format, is_output):
+    # "hmf", "xdmf" (with HDF5 data), or None for everything else
+    if file_format is None:
+        ext = os.path.splitext(filename)[-1]
+        return {".hmf": "hmf", ".xdmf": "xdmf", ".xmf": "xdmf"}.get(ext)
+    file_format = file_format.lower()
+    if file_format == "hmf":
+        return "hmf"
+    xdmf_formats = ["xdmf", "xdmf3"]
+    if is_output:
+        xdmf_formats += ["xdmf-hdf", "xdmf3-hdf"]
+    return "xdmf" if file_format in xdmf_formats else None
+
+
+def _convert_streaming(infile, outfile, args):
+    in_format = _file_format(infile, args.input_format, False)
+    out_format = _file_format(outfile, args.output_format, True)
+    if in_format == "hmf" and out_format == "hmf":
+        repack(
+            infile,
+            outfile,
+            index_dtype=args.index_dtype,
+            float_dtype=args.float_dtype,
+            prune_z_0=args.prune_z_0,
+        )
+    elif in_format == "hmf" and out_format == "xdmf":
+        hmf_to_xdmf(infile, outfile, prune_z_0=args.prune_z_0, workers=args.workers)
+    elif in_format == "xdmf" and out_format == "hmf":
+        xdmf_to_hmf(
+            infile,
+            outfile,
+            prune_z_0=args.prune_z_0,
+            index_dtype=args.index_dtype,
+            float_dtype=args.float_dtype,
+        )
+    else:
+        return False
+    return True
 
 
 def _get_convert_parser():
@@ -57,7 +211,13 @@ def _get_convert_parser():
         formatter_class=argparse.RawTextHelpFormatter,
     )
 
-    parser.add_argument("infile", type=str, help="mesh file to be read from")
+    parser.add_argument(
+        "files",
+        type=str,
+        nargs="+",
+        help="input and output mesh file, or, with --output-dir or\n"
+        "--output-pattern, any number of input files or glob patterns",
+    )
 
     parser.add_argument(
         "--input-format",
@@ -77,7 +237,36 @@ def _get_convert_parser():
         default=None,
     )
 
-    parser.add_argument("outfile", type=str, help="mesh file to be written to")
+    parser.add_argument(
+        "--output-dir",
+        "-d",
+        type=str,
+        default=None,
+        help="directory for the converted files (batch mode)",
+    )
+
+    parser.add_argument(
+        "--output-pattern",
+        type=str,
+        default=None,
+        help="output file name, with {stem}, {name}, and {dir} of the input file\n"
+        "(batch mode, default: {stem}.hmf)",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of files to convert in parallel (default: number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--force",
+        "-f",
+        action="store_true",
+        help="convert files even if the output is newer than the input (batch mode)",
+    )
 
     parser.add_argument(
         "--prune",
@@ -93,6 +282,72 @@ def _get_convert_parser():
         help="remove third (z) dimension if all points are 0",
     )
 
+    parser.add_argument(
+        "--keep-index-dtype",
+        dest="index_dtype",
+        action="store_const",
+        const=None,
+        default="auto",
+        help="don't store HMF cell connectivity with the smallest unsigned integer\n"
+        "type that holds all point indices",
+    )
+
+    parser.add_argument(
+        "--float32",
+        dest="float_dtype",
+        action="store_const",
+        const="float32",
+        default=None,
+        help="store HMF points and floating-point data in single precision",
+    )
+
+    parser.add_argument(
+        "--reorder",
+        "-r",
+        type=str,
+        choices=["hilbert", "morton"],
+        default=None,
+        help="sort points and cells along a space-filling curve",
+    )
+
+    parser.add_argument(
+        "--store-permutation",
+        action="store_true",
+        help="keep the original numbering in the HMF output (with --reorder)",
+    )
+
+    parser.add_argument(
+        "--lod",
+        type=int,
+        default=0,
+        metavar="N",
+        help="store N coarse levels of detail in the HMF output for previews",
+    )
+
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        choices=["predictive", "quantize"],
+        default=None,
+        help="encode HMF points and data as differences between rows (lossless),\n"
+        "quantized with --tolerance for floating-point data",
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=None,
+        help="absolute error bound for --encoding quantize",
+    )
+
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=None,
+        help="number of threads for decompressing HMF input (default: 1)",
+    )
+
     parser.add_argument(
         "--version",
         "-v",
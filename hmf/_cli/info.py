@@ -1,9 +1,12 @@
 import argparse
 import os
 
-import numpy
+import h5py
 
-from .._main import read
+from .._file import HmfFile
+from .._grids import grid_paths
+from .._main import list_grids
+from .._validate import validate
 from .common import _get_version_text
 
 
@@ -12,37 +15,75 @@ def info(argv=None):
     parser = _get_info_parser()
     args = parser.parse_args(argv)
 
-    # read mesh data
-    mesh = read(args.infile)
-    size = os.stat(args.infile).st_size / 1024.0 ** 2
+    size = os.stat(args.infile).st_size / 1024.0**2
     print(f"File size: {size} MB")
-    print(f"Number of points: {mesh.points.shape[0]}")
-    print("Number of cells:")
-    for key, data in mesh.cells.items():
-        print(f"  {key}: {data.shape[0]}")
-    if mesh.point_data:
-        print("Point data: {}".format(", ".join(mesh.point_data.keys())))
-    if mesh.cell_data:
-        keys = set()
-        for key in mesh.cell_data:
-            keys = keys.union(set(list(mesh.cell_data[key].keys())))
-        print("Cell data: {}".format(", ".join(keys)))
-
-    # check if the cell arrays are consistent with the points
-    is_consistent = True
-    for cells in mesh.cells.values():
-        if numpy.any(cells > mesh.points.shape[0]):
-            print("\nATTENTION: Inconsistent mesh. Cells refer to nonexistent points.")
-            is_consistent = False
-            break
+    with h5py.File(args.infile, "r") as f:
+        num_grids = len(grid_paths(f))
+    if num_grids > 1:
+        print("Grids:")
+        for g in list_grids(args.infile):
+            print(f"  {g.name}: {g.num_points} points, {g.num_cells} cells")
+            print(f"    bounding box {list(g.lower)} - {list(g.upper)}")
+        if args.grid is None:
+            return
+
+    # Only read meta data here; nothing gets decompressed unless --check is given.
+    with HmfFile(args.infile, grid=args.grid) as f:
+        print(f"Number of points: {f.num_points}")
+        if f.levels > 1:
+            print(f"Levels of detail: {f.levels - 1}")
+        print("Number of cells:")
+        for key, num in f.num_cells.items():
+            print(f"  {key}: {num}")
+        if f.point_data:
+            print("Point data: {}".format(", ".join(f.point_data.keys())))
+        if f.cell_data_raw:
+            print("Cell data: {}".format(", ".join(f.cell_data_raw.keys())))
+
+        print("Datasets:")
+        arrays = [f.points] + list(f.cells.values())
+        arrays += list(f.point_data.values()) + list(f.cell_data_raw.values())
+        for array in arrays:
+            _print_dataset(array)
 
-    # check if there are redundant points
-    if is_consistent:
-        point_is_used = numpy.zeros(mesh.points.shape[0], dtype=bool)
-        for cells in mesh.cells.values():
-            point_is_used[cells] = True
-        if numpy.any(~point_is_used):
-            print("ATTENTION: Some points are not part of any cell.")
+    if args.check:
+        print()
+        print(
+            validate(
+                args.infile,
+                duplicate_tol=args.duplicates,
+                max_workers=args.workers,
+                grid=args.grid,
+            )
+        )
+
+
+def _print_dataset(array):
+    filters = ", ".join(
+        name if not values else "{}{}".format(name, list(values))
+        for name, values in array.filters
+    )
+    chunks = "contiguous" if array.chunks is None else f"chunks {array.chunks}"
+    print(f"  {array.name}")
+    dtype = array.storage_dtype
+    if dtype != array.dtype:
+        dtype = f"{dtype} (read as {array.dtype})"
+    print(f"    shape {array.shape}, {dtype}, {chunks}")
+    print(f"    filters: {filters if filters else 'none'}")
+    print(
+        f"    stored {_format_bytes(array.storage_size)}, "
+        f"logical {_format_bytes(array.nbytes)}"
+    )
+
+
+def _format_bytes(num):
+    for unit in ["B", "kB", "MB", "GB"]:
+        if num < 1024.0:
+            break
+        num /= 1024.0
+    else:
+        unit = "TB"
+    return f"{num:.1f} {unit}"
 
 
 def _get_info_parser():
@@ -53,6 +94,38 @@ def _get_info_parser():
 
     parser.add_argument("infile", type=str, help="hmf mesh file to be read from")
 
+    parser.add_argument(
+        "--grid",
+        "-g",
+        type=str,
+        default=None,
+        help="grid to show in files with several grids",
+    )
+
+    parser.add_argument(
+        "--check",
+        "-c",
+        action="store_true",
+        help="check the mesh for consistency (reads all data)",
+    )
+
+    parser.add_argument(
+        "--duplicates",
+        "-d",
+        type=float,
+        metavar="TOL",
+        default=None,
+        help="with --check, also look for duplicate points up to tolerance TOL",
+    )
+
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=None,
+        help="with --check, number of worker processes (default: number of CPUs)",
+    )
+
     parser.add_argument(
         "--version",
         "-v",
@@ -1,25 +1,38 @@
 import argparse
 
-from .._main import read as hmf_read
-from .._main import write as hmf_write
+from .._repack import repack_many
 from .common import _get_version_text
+from .compress import _report_errors
 
 
 def uncompress(argv=None):
     # Parse command line arguments.
     parser = _get_parser()
     args = parser.parse_args(argv)
-    mesh = hmf_read(args.file)
-    hmf_write(args.file, mesh, compression=None)
+    # contiguous datasets without any filters, which hmf.read(..., mmap=True) maps
+    errors = repack_many(
+        args.files, max_workers=args.jobs, compression=None, shuffle=False, chunks=False
+    )
+    return _report_errors(errors)
 
 
 def _get_parser():
     parser = argparse.ArgumentParser(
-        description=("Uncompress hmf file."),
+        description=("Uncompress hmf files."),
         formatter_class=argparse.RawTextHelpFormatter,
     )
 
-    parser.add_argument("file", type=str, help="hmf mesh file to uncompress")
+    parser.add_argument(
+        "files", type=str, nargs="+", help="hmf mesh files to uncompress"
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="number of files to process in parallel (default: number of CPUs)",
+    )
 
     parser.add_argument(
         "--version",
@@ -0,0 +1,46 @@
+import numpy
+
+meshio_to_xdmf_type = {
+    "vertex": ["Polyvertex"],
+    "line": ["Polyline"],
+    "triangle": ["Triangle"],
+    "quad": ["Quadrilateral"],
+    "tetra": ["Tetrahedron"],
+    "pyramid": ["Pyramid"],
+    "wedge": ["Wedge"],
+    "hexahedron": ["Hexahedron"],
+    "line3": ["Edge_3"],
+    "triangle6": ["Triangle_6", "Tri_6"],
+    "quad8": ["Quadrilateral_8", "Quad_8"],
+    "tetra10": ["Tetrahedron_10", "Tet_10"],
+    "pyramid13": ["Pyramid_13"],
+    "wedge15": ["Wedge_15"],
+    "hexahedron20": ["Hexahedron_20", "Hex_20"],
+}
+xdmf_to_meshio_type = {v: k for k, vals in meshio_to_xdmf_type.items() for v in vals}
+
+
+def raw_from_cell_data(cell_data):
+    # merge cell data
+    cell_data_raw = {}
+    for d in cell_data.values():
+        for name, values in d.items():
+            if name in cell_data_raw:
+                cell_data_raw[name].append(values)
+            else:
+                cell_data_raw[name] = [values]
+    for name in cell_data_raw:
+        cell_data_raw[name] = numpy.concatenate(cell_data_raw[name])
+
+    return cell_data_raw
+
+
+def cell_data_from_raw(cells, cell_data_raw):
+    cell_data = {k: {} for k in cells}
+    for key in cell_data_raw:
+        d = cell_data_raw[key]
+        r = 0
+        for k in cells:
+            cell_data[k][key] = d[r : r + len(cells[k])]
+            r += len(cells[k])
+    return cell_data
@@ -0,0 +1,230 @@
+import os
+
+import h5py
+import numpy
+
+from meshio.xdmf.common import (
+    attribute_type,
+    meshio_type_to_xdmf_index,
+    numpy_to_xdmf_dtype,
+)
+
+from ._attributes import attribute_group, next_attribute_key, write_index
+from ._common import meshio_to_xdmf_type, xdmf_to_meshio_type
+from ._file import HmfFile
+from ._repack import _copy_dataset, is_z_zero
+from ._storage import StoragePolicy
+
+geometry_types = {1: "X", 2: "XY", 3: "XYZ"}
+
+
+class NotStreamable(ValueError):
+    """Raised before anything is written if a file needs the full-mesh conversion."""
+
+
+def hmf_to_xdmf(infile, outfile, prune_z_0=False, workers=None):
+    """Convert an HMF file to XDMF with the data in a separate HDF5 file, copying one
+    block of rows at a time.
+    """
+    from lxml import etree as ET
+
+    h5_filename = os.path.splitext(outfile)[0] + ".h5"
+    with HmfFile(infile, workers=workers) as f, h5py.File(h5_filename, "w") as h5:
+        writer = _XdmfData(h5, os.path.basename(h5_filename))
+
+        root = ET.Element("Xdmf", Version="3.0")
+        grid = ET.SubElement(ET.SubElement(root, "Domain"), "Grid", Name="Grid")
+        information = ET.SubElement(grid, "Information", Name="Information", Value="0")
+        information.text = ET.CDATA(ET.tostring(ET.Element("main")))
+
+        points = f.points
+        columns = 2 if prune_z_0 and is_z_zero(points) else points.shape[1]
+        geo = ET.SubElement(grid, "Geometry", GeometryType=geometry_types[columns])
+        writer.copy(geo, points, columns)
+
+        if len(f.cells) == 1:
+            key, value = next(iter(f.cells.items()))
+            topo = ET.SubElement(
+                grid,
+                "Topology",
+                TopologyType=meshio_to_xdmf_type[key][0],
+                NumberOfElements=str(len(value)),
+            )
+            writer.copy(topo, value)
+        elif len(f.cells) > 1:
+            topo = ET.SubElement(
+                grid,
+                "Topology",
+                TopologyType="Mixed",
+                NumberOfElements=str(sum(f.num_cells.values())),
+            )
+            writer.copy_mixed(topo, f.cells)
+
+        data = [("Node", f.point_data), ("Cell", f.cell_data_raw)]
+        for center, arrays in data:
+            for name, value in arrays.items():
+                att = ET.SubElement(
+                    grid,
+                    "Attribute",
+                    Name=name,
+                    AttributeType=attribute_type(value),
+                    Center=center,
+                )
+                writer.copy(att, value)
+
+    ET.ElementTree(root).write(outfile, pretty_print=True)
+
+
+class _XdmfData:
+    def __init__(self, h5, h5_basename):
+        self._h5 = h5
+        self._h5_basename = h5_basename
+        self._counter = 0
+
+    def _data_item(self, parent, shape, dtype):
+        from lxml import etree as ET
+
+        name = f"data{self._counter}"
+        self._counter += 1
+        # XDMF knows fewer types than numpy
+        if dtype.name not in numpy_to_xdmf_dtype:
+            dtype = numpy.dtype(float if dtype.kind == "f" else numpy.int64)
+        dt, prec = numpy_to_xdmf_dtype[dtype.name]
+        data_item = ET.SubElement(
+            parent,
+            "DataItem",
+            DataType=dt,
+            Dimensions=" ".join(str(s) for s in shape),
+            Format="HDF",
+            Precision=prec,
+        )
+        data_item.text = f"{self._h5_basename}:/{name}"
+        return self._h5.create_dataset(name, shape, dtype=dtype)
+
+    def copy(self, parent, array, columns=None):
+        shape = array.shape
+        if columns is not None:
+            shape = (shape[0], columns)
+        dset = self._data_item(parent, shape, array.dtype)
+        for s in array.blocks():
+            block = array[s]
+            if columns is not None:
+                block = block[:, :columns]
+            dset[s] = block
+
+    def copy_mixed(self, parent, cells):
+        # Every cell is stored as its XDMF type index followed by its points, lines
+        # additionally with the number of points.
+        def prefix(key):
+            return 2 if key == "line" else 1
+
+        size = sum(len(v) * (v.shape[1] + prefix(k)) for k, v in cells.items())
+        dtype = numpy.result_type(*[value.dtype for value in cells.values()])
+        dset = self._data_item(parent, (size,), dtype)
+        r = 0
+        for key, value in cells.items():
+            for s in value.blocks():
+                block = value[s]
+                head = numpy.full(
+                    (len(block), prefix(key)), meshio_type_to_xdmf_index[key]
+                )
+                if key == "line":
+                    head[:, 1] = 2
+                flat = numpy.column_stack([head, block]).reshape(-1)
+                dset[r : r + len(flat)] = flat
+                r += len(flat)
+
+
+def xdmf_to_hmf(infile, outfile, prune_z_0=False, **kwargs):
+    """Convert an XDMF file with HDF5 data to HMF, copying one block of rows at a time.
+    `kwargs` go to StoragePolicy.
+
+    Only XDMF 3 files with a single grid and one Topology per cell type are supported;
+    others raise NotStreamable.
+    """
+    items = _parse_xdmf(infile)
+    policy = StoragePolicy(**kwargs)
+
+    files = {}
+    try:
+        with h5py.File(outfile, "w") as out:
+            out.attrs["type"] = "hmf"
+            out.attrs["version"] = "0.1"
+            grid = out.create_group("domain").create_group("grid")
+
+            def source(path):
+                filename, h5path = path
+                if filename not in files:
+                    files[filename] = h5py.File(filename, "r")
+                return files[filename][h5path]
+
+            num_points = None
+            k = 0
+            for tag, attrs, path in items:
+                src = source(path)
+                if tag == "Geometry":
+                    _copy_dataset(src, grid, "Geometry", policy, prune_z_0)
+                    num_points = len(src)
+                    geo = grid["Geometry"]
+                    geo.attrs["GeometryType"] = geometry_types[geo.shape[1]]
+                elif tag == "Topology":
+                    key = f"Topology{k}"
+                    k += 1
+                    _copy_dataset(src, grid, key, policy, num_points=num_points)
+                    grid[key].attrs["TopologyType"] = attrs["TopologyType"]
+                else:
+                    group = attribute_group(grid)
+                    key = next_attribute_key(group)
+                    _copy_dataset(src, group, key, policy)
+                    group[key].attrs["Name"] = attrs["Name"]
+                    group[key].attrs["Center"] = attrs["Center"]
+            write_index(grid)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def _parse_xdmf(filename):
+    # List of (tag, attributes, (h5 file name, path)) in the order Geometry,
+    # Topology, Attribute.
+    from lxml import etree as ET
+
+    root = ET.parse(filename, ET.XMLParser(remove_comments=True, huge_tree=True))
+    root = root.getroot()
+    if root.tag != "Xdmf" or root.attrib.get("Version", "")[:1] != "3":
+        raise NotStreamable("Only XDMF 3 files can be streamed")
+    domains = list(root)
+    if len(domains) != 1 or len(domains[0]) != 1 or domains[0][0].tag != "Grid":
+        raise NotStreamable("Only files with one grid can be streamed")
+    grid = domains[0][0]
+
+    items = {"Geometry": [], "Topology": [], "Attribute": []}
+    cell_types = []
+    for c in grid:
+        if c.tag == "Information":
+            # field data; not supported by HMF yet
+            continue
+        if c.tag not in items or len(c) != 1:
+            raise NotStreamable(f"Can't stream XDMF {c.tag!r} sections")
+        attrs = dict(c.attrib)
+        if c.tag == "Topology":
+            cell_type = attrs.get("TopologyType", attrs.get("Type"))
+            if cell_type not in xdmf_to_meshio_type:
+                raise NotStreamable(f"Can't stream {cell_type} topologies")
+            if xdmf_to_meshio_type[cell_type] in cell_types:
+                raise NotStreamable("Can't stream repeated cell types")
+            cell_types.append(xdmf_to_meshio_type[cell_type])
+            attrs["TopologyType"] = meshio_to_xdmf_type[cell_types[-1]][0]
+        elif c.tag == "Attribute" and attrs.get("Center") not in ["Node", "Cell"]:
+            raise NotStreamable(f"Can't stream {attrs.get('Center')} attributes")
+
+        data_item = c[0]
+        if data_item.attrib.get("Format") != "HDF":
+            raise NotStreamable("Only XDMF files with HDF data can be streamed")
+        h5_filename, h5path = data_item.text.strip().split(":")
+        h5_filename = os.path.join(os.path.dirname(filename), h5_filename)
+        items[c.tag].append((c.tag, attrs, (h5_filename, h5path)))
+
+    if len(items["Geometry"]) != 1:
+        raise NotStreamable("Expected exactly one Geometry")
+    return items["Geometry"] + items["Topology"] + items["Attribute"]
@@ -0,0 +1,113 @@
+import numpy
+
+# Predictive encodings store every row as its difference to the row before, which
+# turns smooth data into small numbers (and long runs of zero bytes) that compress
+# much better:
+#
+#   "xor"       floats; the bits of each value XOR those of the value before.
+#               Lossless.
+#   "delta"     integers; differences with wrap-around. Lossless.
+#   "quantize"  floats; rounded to multiples of 2 * tolerance (attribute Scale) above
+#               Offset, then delta-encoded. Every value is within the tolerance. Data
+#               that spans too many multiples falls back to "xor".
+#
+# The prediction restarts every EncodingBlock rows so that slices can be decoded
+# without reading the dataset from the start. EncodedDtype is the type of the decoded
+# values.
+encodings = [None, "predictive", "quantize"]
+
+_default_block = 2**14
+
+
+def _delta(x, block):
+    out = x.copy()
+    out[1:] = x[1:] - x[:-1]
+    out[::block] = x[::block]
+    return out
+
+
+def _xor(x, block):
+    out = x.copy()
+    out[1:] = x[1:] ^ x[:-1]
+    out[::block] = x[::block]
+    return out
+
+
+def _smallest_int(x):
+    if x.size == 0:
+        return x.astype(numpy.int8)
+    lo, hi = x.min(), x.max()
+    for t in [numpy.int8, numpy.int16, numpy.int32]:
+        if numpy.iinfo(t).min <= lo and hi <= numpy.iinfo(t).max:
+            return x.astype(t)
+    return x
+
+
+def _can_quantize(data, scale):
+    # Finite floats whose multiples of `scale` above the minimum fit into int64 with
+    # room for the deltas, and into the float mantissa so that decoding is exact
+    # enough. Anything else is stored with the lossless encoding.
+    if data.dtype.kind != "f" or not numpy.all(numpy.isfinite(data)):
+        return False
+    if len(data) == 0:
+        return True
+    with numpy.errstate(over="ignore"):
+        steps = (data.max(axis=0) - data.min(axis=0)) / scale
+    return bool(numpy.all(steps < 2.0**52))
+
+
+def encode(data, encoding, tolerance=None, block=None):
+    """Returns the array to store and its attributes, or None if `data` can't be
+    encoded (e.g., strings or scalars).
+    """
+    data = numpy.ascontiguousarray(data)
+    if encoding is None or data.ndim == 0 or data.dtype.kind not in "iuf":
+        return None
+    block = _default_block if block is None else block
+
+    if encoding == "quantize" and _can_quantize(data, 2 * tolerance):
+        scale = 2 * tolerance
+        offset = data.min(axis=0) if len(data) > 0 else numpy.zeros(data.shape[1:])
+        q = numpy.rint((data - offset) / scale).astype(numpy.int64)
+        stored = _smallest_int(_delta(q, block))
+        attrs = {"Encoding": "quantize", "Scale": scale, "Offset": offset}
+    elif data.dtype.kind == "f":
+        bits = data.view(numpy.dtype(f"u{data.dtype.itemsize}"))
+        stored = _xor(bits, block)
+        attrs = {"Encoding": "xor"}
+    else:
+        stored = _delta(data, block)
+        attrs = {"Encoding": "delta"}
+    attrs["EncodingBlock"] = block
+    attrs["EncodedDtype"] = data.dtype.str
+    return stored, attrs
+
+
+def decode(raw, attrs):
+    """Decode stored rows; the first row of `raw` must start an encoding block."""
+    encoding = attrs["Encoding"]
+    block = int(attrs["EncodingBlock"])
+    dtype = numpy.dtype(attrs["EncodedDtype"])
+
+    if encoding == "xor":
+        acc = numpy.bitwise_xor.accumulate(raw, axis=0)
+        op = numpy.bitwise_xor
+    else:
+        acc = numpy.cumsum(raw, axis=0, dtype=dtype if encoding == "delta" else None)
+        op = numpy.subtract
+
+    # Take back the prefix of all rows before the start of each block.
+    rows = numpy.arange(len(raw))
+    prev = rows // block * block - 1
+    is_restart = prev >= 0
+    out = acc.copy()
+    out[is_restart] = op(acc[is_restart], acc[prev[is_restart]])
+
+    if encoding == "xor":
+        return out.view(dtype)
+    if encoding == "delta":
+        return out
+    offset = numpy.asarray(attrs["Offset"])
+    # columns may have been dropped, e.g., by repack(prune_z_0=True)
+    offset = offset[tuple(slice(0, n) for n in raw.shape[1:])]
+    return (out * attrs["Scale"] + offset).astype(dtype)
@@ -0,0 +1,420 @@
+import math
+
+import h5py
+import numpy
+
+import meshio
+
+try:
+    # registers additional HDF5 compression filters (blosc, zstd, lz4)
+    import hdf5plugin  # noqa: F401
+except ImportError:
+    pass
+
+from ._attributes import field_maps
+from ._chunks import ChunkMap, can_read_parallel, read_rows, use_threads
+from ._common import xdmf_to_meshio_type
+from ._encoding import decode
+from ._grids import grid_path, grid_paths
+
+
+class LazyArray:
+    """HDF5 dataset proxy; data is only read when sliced or converted."""
+
+    def __init__(self, dataset, workers=None, mmap=False, restore_dtype=True):
+        # With workers > 1, contiguous row ranges of gzip-compressed datasets are
+        # decompressed chunk by chunk in a thread pool. With mmap, contiguous
+        # unfiltered datasets are memory-mapped instead of read. Data that was stored
+        # with a smaller type is converted back unless restore_dtype is False (which
+        # keeps memory-mapped arrays zero-copy). Encoded data is always decoded.
+        self._dataset = dataset
+        self._workers = workers
+        self._chunk_map = None
+        self._encoding = None
+        self._dtype = None
+        if "Encoding" in dataset.attrs:
+            self._encoding = dict(dataset.attrs)
+            self._dtype = numpy.dtype(self._encoding["EncodedDtype"])
+        self._memmap = _memmap(dataset) if mmap and self._encoding is None else None
+        if restore_dtype and "OriginalDtype" in dataset.attrs:
+            self._dtype = numpy.dtype(dataset.attrs["OriginalDtype"])
+
+    def __repr__(self):
+        return f"<hmf.LazyArray {self.name}: shape {self.shape}, type {self.dtype}>"
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if self._memmap is not None:
+            data = self._memmap[key]
+        elif self._encoding is not None:
+            data = self._decode(key)
+        else:
+            rows = self._rows(key)
+            if rows is not None:
+                data = self._read_rows(*rows)
+            else:
+                data = self._dataset[key]
+        if self._dtype is not None:
+            data = numpy.asarray(data).astype(self._dtype, copy=False)
+        return data
+
+    def _rows(self, key, parallel=True):
+        # (start, stop) if `key` selects whole rows; with `parallel`, only if they can
+        # be read in parallel
+        if parallel and (self._workers is None or self._workers <= 1):
+            return None
+        if self.ndim == 0:
+            return None
+        if key is Ellipsis or (isinstance(key, tuple) and key == ()):
+            key = slice(None)
+        if not isinstance(key, slice) or key.step not in [None, 1]:
+            return None
+        if parallel and not can_read_parallel(self._dataset):
+            return None
+        start, stop, _ = key.indices(self.shape[0])
+        stop = max(start, stop)
+        if parallel and not use_threads(self._dataset, start, stop, self._workers):
+            return None
+        return start, stop
+
+    def _read_rows(self, start, stop):
+        # listing the chunks is expensive; do it once per dataset
+        if self._chunk_map is None:
+            self._chunk_map = ChunkMap(self._dataset)
+        return read_rows(self._dataset, start, stop, self._workers, self._chunk_map)
+
+    def _decode(self, key):
+        # Decoding needs the rows from the start of their encoding block.
+        key = key if isinstance(key, tuple) else (key,)
+        rows = None
+        if len(key) > 0 and not (key[0] is Ellipsis and len(key) > 1):
+            rows = self._rows(key[0], parallel=False)
+        if rows is None:
+            (start, stop), rest = (0, self.shape[0]), key
+        else:
+            (start, stop), rest = rows, (slice(None),) + key[1:]
+        block = int(self._encoding["EncodingBlock"])
+        first = start // block * block
+        if self._rows(slice(first, stop)) is not None:
+            raw = self._read_rows(first, stop)
+        else:
+            raw = self._dataset[first:stop]
+        return decode(raw, self._encoding)[start - first :][rest]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.read()
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    @property
+    def name(self):
+        return self._dataset.name
+
+    @property
+    def attrs(self):
+        return self._dataset.attrs
+
+    @property
+    def shape(self):
+        return self._dataset.shape
+
+    @property
+    def dtype(self):
+        # the type of the returned data
+        return self._dataset.dtype if self._dtype is None else self._dtype
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return self._dataset.size
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    @property
+    def storage_dtype(self):
+        return self._dataset.dtype
+
+    @property
+    def storage_size(self):
+        return self._dataset.id.get_storage_size()
+
+    @property
+    def chunks(self):
+        return self._dataset.chunks
+
+    @property
+    def filters(self):
+        plist = self._dataset.id.get_create_plist()
+        out = []
+        for k in range(plist.get_nfilters()):
+            _, _, values, name = plist.get_filter(k)
+            name = name.decode() if isinstance(name, bytes) else name
+            # plugin filters have long descriptions
+            name = name.split(";")[0]
+            out.append((name, tuple(values)))
+        return out
+
+    def blocks(self, max_bytes=2**24, align=1):
+        # Yield row slices aligned with the HDF5 chunks so that every chunk is
+        # decompressed exactly once. `align` can be used to additionally align the
+        # slices with the chunks of a target dataset.
+        n = self.shape[0] if self.ndim > 0 else 0
+        row_bytes = max(1, self.nbytes // n) if n > 0 else 1
+        step = max(1, max_bytes // row_bytes)
+        if self.chunks is not None:
+            align = align * self.chunks[0] // math.gcd(align, self.chunks[0])
+        step = max(1, step // align) * align
+        for start in range(0, n, step):
+            yield slice(start, min(start + step, n))
+
+    def read(self):
+        return self[()]
+
+
+class HmfFile:
+    """Open HMF file with points, cells and data as LazyArrays.
+
+    Files with several grids need `grid`, e.g., "domain/part0" or just "part0" for a
+    grid in the default domain; see `grids`. `level` > 0 opens a coarse level of
+    detail; see `levels`.
+
+    With `mmap`, arrays keep the compact type they are stored with (e.g., uint8
+    connectivity with the default index_dtype="auto") since converting them back
+    would copy them; pass restore_dtype=True to convert them anyway.
+    """
+
+    def __init__(
+        self,
+        filename,
+        workers=None,
+        mmap=False,
+        restore_dtype=None,
+        grid=None,
+        level=0,
+        **kwargs,
+    ):
+        # kwargs go to h5py.File, e.g., driver="mpio"
+        if restore_dtype is None:
+            restore_dtype = not mmap
+        self._grid_name = grid
+        self._level = level
+        self._array_kwargs = {
+            "workers": workers,
+            "mmap": mmap,
+            "restore_dtype": restore_dtype,
+        }
+        self._file = h5py.File(filename, "r", **kwargs)
+        try:
+            self._parse()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _parse(self):
+        f = self._file
+        assert f.attrs["type"] == "hmf"
+        assert f.attrs["version"] == "0.1"
+
+        self.grids = grid_paths(f)
+        if self._grid_name is not None:
+            path = grid_path(self._grid_name)
+            if path not in self.grids:
+                raise ValueError(f"No grid {path!r} in {f.filename}")
+        elif len(self.grids) == 1:
+            path = self.grids[0]
+        else:
+            raise ValueError(
+                f"{f.filename} has {len(self.grids)} grids; pick one of "
+                f"{', '.join(self.grids)} with grid=..."
+            )
+        grid = f[path]
+        # the full resolution is level 0
+        self.levels = 1 + len(grid["LOD"]) if "LOD" in grid else 1
+        if self._level != 0:
+            if not 0 < self._level < self.levels:
+                raise ValueError(
+                    f"No level {self._level} in {path}; there are {self.levels}"
+                )
+            grid = grid["LOD"][f"Level{self._level}"]
+        self._grid = grid
+
+        self.points = None
+        self.cells = {}
+        self.point_data = {}
+        # cell data is stored as one array across all cell blocks
+        self.cell_data_raw = {}
+        self.field_data = {}
+
+        topologies = []
+        for key, value in grid.items():
+            if key[:8] == "Topology":
+                topologies.append((int(key[8:]), value))
+
+            elif key == "Geometry":
+                # TODO is GeometryType really needed?
+                assert value.attrs["GeometryType"] in ["XY", "XYZ"]
+                self.points = LazyArray(value, **self._array_kwargs)
+
+            elif key == "Attributes":
+                self.point_data, self.cell_data_raw = field_maps(
+                    value, lambda dataset: LazyArray(dataset, **self._array_kwargs)
+                )
+
+            elif key in [
+                "TimeSeries",
+                "Partitions",
+                "Permutation",
+                "SpatialIndex",
+                "LOD",
+            ]:
+                # handled by TimeSeriesReader, read_parallel and read_region;
+                # Permutation is for the user
+                continue
+
+            else:
+                # single attribute of older files
+                assert key == "Attribute"
+                _add_attribute(
+                    value, self.point_data, self.cell_data_raw, **self._array_kwargs
+                )
+
+        # Keep the order in which the blocks were written; h5py iterates in
+        # alphabetical order (Topology10 < Topology2).
+        for _, value in sorted(topologies, key=lambda item: item[0]):
+            cell_type = value.attrs["TopologyType"]
+            self.cells[xdmf_to_meshio_type[cell_type]] = LazyArray(
+                value, **self._array_kwargs
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def filename(self):
+        return self._file.filename
+
+    @property
+    def num_points(self):
+        return self.points.shape[0]
+
+    @property
+    def num_cells(self):
+        return {key: value.shape[0] for key, value in self.cells.items()}
+
+    def read(
+        self,
+        cell_types=None,
+        point_data=None,
+        cell_data=None,
+        point_range=None,
+        cell_range=None,
+    ):
+        # Only the selected blocks, fields and ranges are read from the file.
+        # `cell_range` refers to the cell numbering across all blocks (the same as
+        # in the raw cell data). If `point_range` is given, only cells that are
+        # entirely in that range are returned, renumbered relative to its start.
+        cell_types = _select(cell_types, self.cells, "cell type")
+        point_data_names = _select(point_data, self.point_data, "point data")
+        cell_data_names = _select(cell_data, self.cell_data_raw, "cell data")
+
+        if point_range is None:
+            point_range = (0, self.num_points)
+        p0, p1 = point_range = tuple(point_range)
+
+        cells = {}
+        cell_data = {}
+        offsets = numpy.cumsum([0] + [len(value) for value in self.cells.values()])
+        for (key, value), offset in zip(self.cells.items(), offsets):
+            if key not in cell_types:
+                continue
+            start, stop = offset, offset + len(value)
+            if cell_range is not None:
+                start = max(start, cell_range[0])
+                stop = min(stop, cell_range[1])
+                if start >= stop:
+                    continue
+            block = value[start - offset : stop - offset]
+            data = {
+                name: self.cell_data_raw[name][start:stop] for name in cell_data_names
+            }
+            if point_range != (0, self.num_points):
+                is_inside = numpy.all((block >= p0) & (block < p1), axis=1)
+                block = block[is_inside] - block.dtype.type(p0)
+                data = {name: values[is_inside] for name, values in data.items()}
+            cells[key] = block
+            cell_data[key] = data
+
+        return meshio.Mesh(
+            self.points[p0:p1],
+            cells,
+            point_data={
+                name: self.point_data[name][p0:p1] for name in point_data_names
+            },
+            cell_data=cell_data,
+            field_data=self.field_data,
+        )
+
+
+def _add_attribute(dataset, point_data, cell_data_raw, **kwargs):
+    name = dataset.attrs["Name"]
+    if dataset.attrs["Center"] == "Node":
+        point_data[name] = LazyArray(dataset, **kwargs)
+    else:
+        assert dataset.attrs["Center"] == "Cell"
+        cell_data_raw[name] = LazyArray(dataset, **kwargs)
+
+
+def _memmap(dataset):
+    # The data of contiguous datasets without filters sits as is at one offset in
+    # the file. Copy-on-write, so the pages are shared between processes until
+    # someone modifies them.
+    if dataset.ndim == 0 or dataset.dtype.kind not in "biufc":
+        return None
+    plist = dataset.id.get_create_plist()
+    if plist.get_layout() != h5py.h5d.CONTIGUOUS or dataset.external:
+        return None
+    if dataset.file.driver != "sec2":
+        return None
+    offset = dataset.id.get_offset()
+    if offset is None:
+        # storage not allocated, e.g., empty datasets
+        return None
+    return numpy.memmap(
+        dataset.file.filename,
+        dtype=dataset.dtype,
+        mode="c",
+        offset=offset,
+        shape=dataset.shape,
+    )
+
+
+def _select(names, available, what):
+    if names is None:
+        return list(available)
+    for name in names:
+        if name not in available:
+            raise KeyError(f"No {what} {name!r} in file")
+    return list(names)
+
+
+def open(filename, workers=None, mmap=False, restore_dtype=None, grid=None, level=0):
+    return HmfFile(
+        filename,
+        workers=workers,
+        mmap=mmap,
+        restore_dtype=restore_dtype,
+        grid=grid,
+        level=level,
+    )
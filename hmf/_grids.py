@@ -0,0 +1,99 @@
+import collections
+
+import h5py
+import numpy
+
+# Files may hold several grids, e.g., one per partition or material, as
+# /{domain}/{grid} groups. The root dataset Grids lists their paths with counts and
+# bounding boxes so that readers can pick grids without opening them. Coordinates of
+# 1D and 2D grids are padded with 0 in the bounding box.
+
+GridInfo = collections.namedtuple(
+    "GridInfo", ["name", "num_points", "num_cells", "lower", "upper"]
+)
+
+
+def grid_path(name):
+    # "part0" is short for "domain/part0"
+    path = name.strip("/") if "/" in name else f"domain/{name}"
+    if path.count("/") != 1:
+        raise ValueError(f"Grid names are domain/grid, not {name!r}")
+    return path
+
+
+def grid_paths(h5_file):
+    if "Grids" in h5_file:
+        return [info.name for info in read_directory(h5_file)]
+    paths = []
+    for domain_name, domain in h5_file.items():
+        if not isinstance(domain, h5py.Group):
+            continue
+        for name, grid in domain.items():
+            if isinstance(grid, h5py.Group):
+                paths.append(f"{domain_name}/{name}")
+    return paths
+
+
+def mesh_info(name, mesh):
+    points = numpy.asarray(mesh.points)
+    lower, upper = bounding_box(points)
+    num_cells = sum(len(value) for value in mesh.cells.values())
+    return GridInfo(name, len(points), num_cells, lower, upper)
+
+
+def bounding_box(points):
+    # padded to 3D; NaN for empty grids. Reads LazyArrays block by block.
+    lower = numpy.full(3, numpy.inf)
+    upper = numpy.full(3, -numpy.inf)
+    dim = points.shape[1]
+    for s in points.blocks() if hasattr(points, "blocks") else [slice(None)]:
+        block = points[s]
+        if len(block) > 0:
+            lower[:dim] = numpy.minimum(lower[:dim], block.min(axis=0))
+            upper[:dim] = numpy.maximum(upper[:dim], block.max(axis=0))
+    if numpy.isinf(lower[0]):
+        return numpy.full(3, numpy.nan), numpy.full(3, numpy.nan)
+    lower[dim:] = 0.0
+    upper[dim:] = 0.0
+    return lower, upper
+
+
+def write_directory(h5_file, infos):
+    # fixed-length names, like the attribute index
+    length = max([1] + [len(info.name.encode()) for info in infos])
+    dtype = [
+        ("name", f"S{length}"),
+        ("num_points", numpy.int64),
+        ("num_cells", numpy.int64),
+        ("lower", numpy.float64, (3,)),
+        ("upper", numpy.float64, (3,)),
+    ]
+    data = numpy.array(
+        [
+            (
+                info.name.encode(),
+                info.num_points,
+                info.num_cells,
+                info.lower,
+                info.upper,
+            )
+            for info in infos
+        ],
+        dtype=dtype,
+    )
+    if "Grids" in h5_file:
+        del h5_file["Grids"]
+    h5_file.create_dataset("Grids", data=data)
+
+
+def read_directory(h5_file):
+    return [
+        GridInfo(
+            row["name"].decode(),
+            int(row["num_points"]),
+            int(row["num_cells"]),
+            row["lower"],
+            row["upper"],
+        )
+        for row in h5_file["Grids"][()]
+    ]
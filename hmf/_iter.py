@@ -0,0 +1,96 @@
+import queue
+import threading
+
+from ._file import HmfFile
+
+
+def iter_cells(filename, cell_type, batch_size=None, prefetch=1):
+    """Yield the cells of one type in batches of `batch_size` rows.
+
+    By default, the batches follow the chunks of the Topology dataset. With
+    `prefetch` > 0, a background thread reads that many batches ahead so that reading
+    and decompression overlap with the consumer's work.
+    """
+    with HmfFile(filename) as f:
+        cells = f.cells[cell_type]
+        batch_size = _batch_size(cells, batch_size)
+        yield from _iter_batches(cells, 0, len(cells), batch_size, prefetch)
+
+
+def iter_cell_data(filename, name, cell_type, batch_size=None, prefetch=1):
+    """Yield the cell data `name` of one cell type in batches aligned with
+    iter_cells(filename, cell_type, batch_size).
+    """
+    with HmfFile(filename) as f:
+        offset = 0
+        for key, value in f.cells.items():
+            if key == cell_type:
+                break
+            offset += len(value)
+        cells = f.cells[cell_type]
+        batch_size = _batch_size(cells, batch_size)
+        yield from _iter_batches(
+            f.cell_data_raw[name], offset, offset + len(cells), batch_size, prefetch
+        )
+
+
+def iter_point_data(filename, name, batch_size=None, prefetch=1):
+    with HmfFile(filename) as f:
+        data = f.point_data[name]
+        batch_size = _batch_size(data, batch_size)
+        yield from _iter_batches(data, 0, len(data), batch_size, prefetch)
+
+
+def _batch_size(array, batch_size):
+    if batch_size is not None:
+        return batch_size
+    if array.chunks is not None:
+        return array.chunks[0]
+    return next(array.blocks(), slice(0, 1)).stop
+
+
+def _iter_batches(array, start, stop, batch_size, prefetch):
+    slices = [
+        slice(k, min(k + batch_size, stop)) for k in range(start, stop, batch_size)
+    ]
+    if prefetch == 0:
+        for s in slices:
+            yield array[s]
+        return
+
+    q = queue.Queue(maxsize=prefetch)
+    done = threading.Event()
+
+    def put(item):
+        # don't block forever if the consumer has stopped
+        while not done.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for s in slices:
+                if not put((array[s], None)):
+                    return
+        except Exception as e:
+            put((None, e))
+            return
+        put((None, None))
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch, error = q.get()
+            if error is not None:
+                raise error
+            if batch is None:
+                break
+            yield batch
+    finally:
+        done.set()
+        thread.join()
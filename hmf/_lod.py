@@ -0,0 +1,81 @@
+import numpy
+
+import meshio
+
+# Coarse levels of detail are stored as grid/LOD/Level{k}, k = 1, 2, ..., each with
+# the layout of a grid. They are made by vertex clustering: the points in every cell
+# of a regular grid are merged into one at their mean, and cells that collapse are
+# dropped. The grid spacing doubles from level to level.
+
+
+def _spacing(points):
+    # about the mean distance of the points, from the volume of the bounding box of
+    # the axes the points extend along
+    extent = points.max(axis=0) - points.min(axis=0)
+    extent = extent[extent > 0]
+    if len(extent) == 0:
+        return 1.0
+    return (numpy.prod(extent) / len(points)) ** (1.0 / len(extent))
+
+
+def cluster(mesh, lower, cell_size):
+    """Merge the points of `mesh` that fall into the same cell of the grid with the
+    origin `lower` and the given cell size. Point data is averaged, cells that
+    collapse or coincide are dropped.
+    """
+    points = numpy.asarray(mesh.points)
+    ijk = numpy.floor((points - lower) / cell_size).astype(numpy.int64)
+    keys = numpy.ravel_multi_index(ijk.T, tuple(ijk.max(axis=0) + 1))
+    _, inverse, counts = numpy.unique(keys, return_inverse=True, return_counts=True)
+
+    def average(values):
+        values = numpy.asarray(values)
+        flat = values.reshape(len(values), -1)
+        out = numpy.empty((len(counts), flat.shape[1]))
+        for k in range(flat.shape[1]):
+            out[:, k] = numpy.bincount(inverse, weights=flat[:, k]) / counts
+        out = out.reshape((len(counts),) + values.shape[1:])
+        return out.astype(values.dtype) if values.dtype.kind == "f" else out
+
+    cells = {}
+    cell_data = {}
+    for key, value in mesh.cells.items():
+        value = inverse[numpy.asarray(value)]
+        s = numpy.sort(value, axis=1)
+        is_kept = numpy.all(s[:, 1:] != s[:, :-1], axis=1)
+        # first of coinciding cells, in the original order
+        _, first = numpy.unique(s[is_kept], axis=0, return_index=True)
+        keep = numpy.flatnonzero(is_kept)[numpy.sort(first)]
+        if len(keep) == 0:
+            continue
+        cells[key] = value[keep]
+        cell_data[key] = {
+            name: numpy.asarray(values)[keep]
+            for name, values in mesh.cell_data.get(key, {}).items()
+        }
+
+    return meshio.Mesh(
+        average(points),
+        cells,
+        point_data={
+            name: average(values)
+            for name, values in mesh.point_data.items()
+            if numpy.asarray(values).dtype.kind in "biuf"
+        },
+        cell_data=cell_data,
+    )
+
+
+def levels(mesh, num_levels):
+    """Yield `num_levels` coarser versions of the mesh, each with about 2**dim times
+    fewer points than the one before.
+    """
+    points = numpy.asarray(mesh.points)
+    if len(points) == 0:
+        return
+    lower = points.min(axis=0)
+    cell_size = _spacing(points)
+    for _ in range(num_levels):
+        cell_size *= 2
+        mesh = cluster(mesh, lower, cell_size)
+        yield mesh
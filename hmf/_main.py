@@ -1,122 +1,246 @@
+import concurrent.futures
+
 import h5py
 import numpy
 
 import meshio
 
-meshio_to_xdmf_type = {
-    "vertex": ["Polyvertex"],
-    "line": ["Polyline"],
-    "triangle": ["Triangle"],
-    "quad": ["Quadrilateral"],
-    "tetra": ["Tetrahedron"],
-    "pyramid": ["Pyramid"],
-    "wedge": ["Wedge"],
-    "hexahedron": ["Hexahedron"],
-    "line3": ["Edge_3"],
-    "triangle6": ["Triangle_6", "Tri_6"],
-    "quad8": ["Quadrilateral_8", "Quad_8"],
-    "tetra10": ["Tetrahedron_10", "Tet_10"],
-    "pyramid13": ["Pyramid_13"],
-    "wedge15": ["Wedge_15"],
-    "hexahedron20": ["Hexahedron_20", "Hex_20"],
-}
-xdmf_to_meshio_type = {v: k for k, vals in meshio_to_xdmf_type.items() for v in vals}
-
-
-def raw_from_cell_data(cell_data):
-    # merge cell data
-    cell_data_raw = {}
-    for d in cell_data.values():
-        for name, values in d.items():
-            if name in cell_data_raw:
-                cell_data_raw[name].append(values)
-            else:
-                cell_data_raw[name] = [values]
-    for name in cell_data_raw:
-        cell_data_raw[name] = numpy.concatenate(cell_data_raw[name])
+from ._attributes import add_attribute, write_index
+from ._cache import ReadCache
+from ._common import meshio_to_xdmf_type
+from ._file import HmfFile
+from ._grids import (
+    GridInfo,
+    bounding_box,
+    grid_path,
+    grid_paths,
+    mesh_info,
+    read_directory,
+    write_directory,
+)
+from ._lod import levels as lod_levels
+from ._region import default_bucket_size, write_spatial_index
+from ._reorder import curves
+from ._reorder import reorder as reorder_mesh
+from ._storage import StoragePolicy
+
+
+def read(
+    filename,
+    cell_types=None,
+    point_data=None,
+    cell_data=None,
+    point_range=None,
+    cell_range=None,
+    workers=None,
+    cache=None,
+    mmap=False,
+    restore_dtype=None,
+    grid=None,
+    level=0,
+):
+    # `grid` picks one grid of files with several; see list_grids. `level` > 0 reads
+    # a coarse level of detail, if the file has one.
+    # `workers` threads decompress the chunks of gzip-compressed datasets. With
+    # `cache` (True or a ReadCache), the decompressed arrays are kept on disk and
+    # memory-mapped on later reads of the same file. With `mmap`, uncompressed files
+    # are memory-mapped directly; the two can't be combined. Without `restore_dtype`,
+    # arrays keep the compact type they are stored with; that is the default with
+    # `mmap`, since converting memory-mapped arrays copies them.
+    if cache and mmap:
+        raise ValueError("Use either cache or mmap, not both")
+    if restore_dtype is None:
+        restore_dtype = not mmap
+    kwargs = {
+        "cell_types": cell_types,
+        "point_data": point_data,
+        "cell_data": cell_data,
+        "point_range": point_range,
+        "cell_range": cell_range,
+    }
+    if cache:
+        if cache is True:
+            cache = ReadCache()
+        return cache.read(
+            filename,
+            workers=workers,
+            restore_dtype=restore_dtype,
+            grid=grid,
+            level=level,
+            **kwargs,
+        )
+    with HmfFile(
+        filename,
+        workers=workers,
+        mmap=mmap,
+        restore_dtype=restore_dtype,
+        grid=grid,
+        level=level,
+    ) as f:
+        return f.read(**kwargs)
 
-    return cell_data_raw
 
+def read_grids(filename, grids=None, max_workers=None, **kwargs):
+    """Read several grids, by default all, in a process pool. Returns a dictionary
+    mapping the grid names to meshes; `kwargs` go to read.
+    """
+    if grids is None:
+        with h5py.File(filename, "r") as f:
+            grids = grid_paths(f)
+    grids = [grid_path(name) for name in grids]
+    if max_workers == 1 or len(grids) < 2:
+        return {name: read(filename, grid=name, **kwargs) for name in grids}
 
-def cell_data_from_raw(cells, cell_data_raw):
-    cell_data = {k: {} for k in cells}
-    for key in cell_data_raw:
-        d = cell_data_raw[key]
-        r = 0
-        for k in cells:
-            cell_data[k][key] = d[r : r + len(cells[k])]
-            r += len(cells[k])
-    return cell_data
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = [
+            executor.submit(read, filename, grid=name, **kwargs) for name in grids
+        ]
+        return {name: future.result() for name, future in zip(grids, futures)}
 
 
-def read(filename):
+def list_grids(filename):
+    """GridInfo (name, num_points, num_cells, lower, upper) of every grid. Only the
+    directory is read; for files without one, the bounding boxes are computed from
+    the points.
+    """
     with h5py.File(filename, "r") as f:
-        assert f.attrs["type"] == "hmf"
-        assert f.attrs["version"] == "0.1"
-
-        assert len(f) == 1, "only one domain supported for now"
-        domain = f["domain"]
-
-        assert len(domain) == 1, "only one grid supported for now"
-        grid = domain["grid"]
-
-        points = None
-        cells = {}
-        point_data = {}
-        cell_data_raw = {}
-        field_data = {}
-
-        for key, value in grid.items():
-            if key[:8] == "Topology":
-                cell_type = value.attrs["TopologyType"]
-                cells[xdmf_to_meshio_type[cell_type]] = value[()]
-
-            elif key == "Geometry":
-                # TODO is GeometryType really needed?
-                assert value.attrs["GeometryType"] in ["XY", "XYZ"]
-                points = value[()]
-
-            else:
-                assert key == "Attribute"
-                name = value.attrs["Name"]
-                if value.attrs["Center"] == "Node":
-                    point_data[name] = value[()]
-                else:
-                    assert value.attrs["Center"] == "Cell"
-                    cell_data_raw[name] = value[()]
-
-        cell_data = cell_data_from_raw(cells, cell_data_raw)
-
-        return meshio.Mesh(
-            points,
-            cells,
-            point_data=point_data,
-            cell_data=cell_data,
-            field_data=field_data,
-        )
+        if "Grids" in f:
+            return read_directory(f)
+        paths = grid_paths(f)
+    infos = []
+    for path in paths:
+        with HmfFile(filename, grid=path) as f:
+            lower, upper = bounding_box(f.points)
+            num_cells = sum(f.num_cells.values())
+            infos.append(GridInfo(path, f.num_points, num_cells, lower, upper))
+    return infos
 
 
 def write_points_cells(filename, points, cells, **kwargs):
     write(filename, meshio.Mesh(points, cells), **kwargs)
 
 
-def write(filename, mesh, compression="gzip", compression_opts=None):
+def write(
+    filename,
+    mesh,
+    compression="gzip",
+    compression_opts=None,
+    shuffle=None,
+    chunks=None,
+    index_dtype="auto",
+    float_dtype=None,
+    reorder=None,
+    store_permutation=False,
+    spatial_index=False,
+    lod=0,
+    encoding=None,
+    tolerance=None,
+):
+    # With `reorder` ("hilbert" or "morton"), points and cells are sorted along a
+    # space-filling curve, which helps compression and locality. With
+    # `store_permutation`, Permutation/Points[k] and Permutation/Cells{i}[k] give the
+    # original index of the stored point k and of cell k in block i.
+    # `spatial_index` (True or the number of cells per bucket) stores the bounding
+    # boxes of buckets of cells for read_region. It implies reorder="hilbert" unless
+    # another curve is given. `lod` coarse versions of the mesh are stored for
+    # previews; read them with `level`. `encoding` ("predictive" or "quantize" with
+    # `tolerance`) encodes points and fields; see StoragePolicy.
+    write_grids(
+        filename,
+        {"domain/grid": mesh},
+        compression,
+        compression_opts,
+        shuffle,
+        chunks,
+        index_dtype,
+        float_dtype,
+        reorder,
+        store_permutation,
+        spatial_index,
+        lod,
+        encoding,
+        tolerance,
+    )
+
+
+def write_grids(
+    filename,
+    meshes,
+    compression="gzip",
+    compression_opts=None,
+    shuffle=None,
+    chunks=None,
+    index_dtype="auto",
+    float_dtype=None,
+    reorder=None,
+    store_permutation=False,
+    spatial_index=False,
+    lod=0,
+    encoding=None,
+    tolerance=None,
+):
+    """Write several meshes, e.g., the partitions or materials of a model, as grids
+    of one file. `meshes` maps grid names ("part0" or "domain/part0") to meshes; the
+    other arguments are as for write.
+    """
+    policy = StoragePolicy(
+        compression,
+        compression_opts,
+        shuffle,
+        chunks,
+        index_dtype,
+        float_dtype,
+        encoding,
+        tolerance,
+    )
+    # before the file is truncated
+    if reorder not in [None] + curves:
+        raise ValueError(f"Unknown curve {reorder!r}")
+    if spatial_index and reorder is None:
+        reorder = "hilbert"
+    if spatial_index is True:
+        spatial_index = default_bucket_size
     with h5py.File(filename, "w") as h5_file:
         h5_file.attrs["type"] = "hmf"
         h5_file.attrs["version"] = "0.1"
-        domain = h5_file.create_group("domain")
-        grid = domain.create_group("grid")
-        # information = grid.create_group("information")
-        # information.attrs["value"] = len(mesh.field_data)
+        infos = []
+        for name, mesh in meshes.items():
+            path = grid_path(name)
+            domain_name, grid_name = path.split("/")
+            grid = h5_file.require_group(domain_name).create_group(grid_name)
+            if reorder is not None:
+                mesh, point_perm, cell_perms = reorder_mesh(mesh, reorder)
+            write_mesh(grid, mesh, policy)
+            if reorder is not None and store_permutation:
+                group = grid.create_group("Permutation")
+                policy.create_dataset(group, "Points", "Attribute", point_perm)
+                for k, key in enumerate(mesh.cells):
+                    policy.create_dataset(
+                        group, f"Cells{k}", "Attribute", cell_perms[key]
+                    )
+            if spatial_index:
+                write_spatial_index(grid, mesh.points, mesh.cells, spatial_index)
+            if lod > 0:
+                group = grid.create_group("LOD")
+                for k, coarse in enumerate(lod_levels(mesh, lod)):
+                    write_mesh(group.create_group(f"Level{k + 1}"), coarse, policy)
+            infos.append(mesh_info(path, mesh))
+        write_directory(h5_file, infos)
+
+
+def write_mesh(grid, mesh, policy):
+    # information = grid.create_group("information")
+    # information.attrs["value"] = len(mesh.field_data)
 
-        write_points(grid, mesh.points, compression, compression_opts)
-        # self.field_data(mesh.field_data, information)
-        write_cells(mesh.cells, grid, compression, compression_opts)
-        write_point_data(mesh.point_data, grid, compression, compression_opts)
-        write_cell_data(mesh.cell_data, grid, compression, compression_opts)
+    write_points(grid, mesh.points, policy)
+    # self.field_data(mesh.field_data, information)
+    write_cells(mesh.cells, grid, policy, len(mesh.points))
+    write_point_data(mesh.point_data, grid, policy)
+    write_cell_data(mesh.cell_data, grid, policy)
+    write_index(grid)
 
 
-def write_points(grid, points, compression, compression_opts):
+def write_points(grid, points, policy):
     if points.shape[1] == 1:
         geometry_type = "X"
     elif points.shape[1] == 2:
@@ -125,47 +249,37 @@ def write_points(grid, points, compression, compression_opts):
         assert points.shape[1] == 3
         geometry_type = "XYZ"
 
-    geo = grid.create_dataset(
-        "Geometry",
-        data=points,
-        compression=compression,
-        compression_opts=compression_opts,
-    )
+    geo = policy.create_dataset(grid, "Geometry", "Geometry", points, encode=True)
     geo.attrs["GeometryType"] = geometry_type
 
 
-def write_cells(cells, grid, compression, compression_opts):
+def write_cells(cells, grid, policy, num_points):
     for k, (meshio_type, value) in enumerate(cells.items()):
         xdmf_type = meshio_to_xdmf_type[meshio_type][0]
-        topo = grid.create_dataset(
-            f"Topology{k}",
-            data=value,
-            compression=compression,
-            compression_opts=compression_opts,
+        value = numpy.asarray(value)
+        # the index type must hold all points, and whatever else is in the cells
+        value_range = (0, num_points - 1)
+        if value.size > 0:
+            value_range = (
+                min(value_range[0], value.min()),
+                max(value_range[1], value.max()),
+            )
+        topo = policy.create_dataset(
+            grid, f"Topology{k}", "Topology", value, value_range
         )
         topo.attrs["TopologyType"] = xdmf_type
 
 
-def write_point_data(point_data, grid, compression, compression_opts):
+def write_point_data(point_data, grid, policy):
     for name, data in point_data.items():
-        att = grid.create_dataset(
-            "Attribute",
-            data=data,
-            compression=compression,
-            compression_opts=compression_opts,
-        )
-        att.attrs["Name"] = name
-        att.attrs["Center"] = "Node"
-
-
-def write_cell_data(cell_data, grid, compression, compression_opts):
-    raw = raw_from_cell_data(cell_data)
-    for name, data in raw.items():
-        att = grid.create_dataset(
-            "Attribute",
-            data=data,
-            compression=compression,
-            compression_opts=compression_opts,
-        )
-        att.attrs["Name"] = name
-        att.attrs["Center"] = "Cell"
+        add_attribute(grid, name, "Node", data, policy)
+
+
+def write_cell_data(cell_data, grid, policy):
+    # merge the blocks one name at a time to keep only one merged array in memory
+    names = []
+    for d in cell_data.values():
+        names += [name for name in d if name not in names]
+    for name in names:
+        data = numpy.concatenate([d[name] for d in cell_data.values() if name in d])
+        add_attribute(grid, name, "Cell", data, policy)
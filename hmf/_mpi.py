@@ -0,0 +1,227 @@
+import h5py
+import numpy
+
+import meshio
+
+from ._attributes import create_attribute, write_index
+from ._common import meshio_to_xdmf_type
+from ._file import HmfFile
+
+
+def _check_mpi():
+    if not h5py.get_config().mpi:
+        raise RuntimeError("Parallel I/O requires h5py built with MPI support")
+
+
+def _exclusive_sum(counts):
+    return numpy.concatenate([[0], numpy.cumsum(counts)[:-1]]).astype(int)
+
+
+def write_parallel(filename, mesh, comm, point_offset=None, cell_offsets=None):
+    """Collectively write one partition per rank of `comm` into one HMF file.
+
+    Every rank passes its local mesh, with cells in local point numbering. The global
+    offsets of the rank's points and cells (per cell type) default to the exclusive
+    prefix sums over the ranks.
+    """
+    _check_mpi()
+
+    # Everything needed to create the datasets; those calls are collective and must be
+    # identical on all ranks.
+    local = {
+        "num_points": len(mesh.points),
+        "point_offset": point_offset,
+        "points": (mesh.points.shape[1:], mesh.points.dtype.str),
+        "cells": {
+            key: (len(value), value.shape[1:], value.dtype.str)
+            for key, value in mesh.cells.items()
+        },
+        "cell_offsets": cell_offsets,
+        "point_data": {
+            name: (values.shape[1:], values.dtype.str)
+            for name, values in mesh.point_data.items()
+        },
+        "cell_data": {
+            name: (values.shape[1:], values.dtype.str)
+            for d in mesh.cell_data.values()
+            for name, values in d.items()
+        },
+    }
+    ranks = comm.allgather(local)
+
+    cell_types = [
+        key for key in meshio_to_xdmf_type if any(key in r["cells"] for r in ranks)
+    ]
+    point_offsets = _offsets(
+        [r["num_points"] for r in ranks], [r["point_offset"] for r in ranks]
+    )
+    num_points = max(o + r["num_points"] for o, r in zip(point_offsets, ranks))
+
+    # global cell offsets and number of cells per type
+    cell_offsets = {}
+    num_cells = {}
+    for key in cell_types:
+        counts = [r["cells"][key][0] if key in r["cells"] else 0 for r in ranks]
+        offsets = [
+            None if r["cell_offsets"] is None else r["cell_offsets"].get(key, 0)
+            for r in ranks
+        ]
+        cell_offsets[key] = _offsets(counts, offsets)
+        num_cells[key] = max(o + c for o, c in zip(cell_offsets[key], counts))
+    # start of each type in the raw cell data
+    raw_offsets = dict(
+        zip(cell_types, _exclusive_sum([num_cells[key] for key in cell_types]))
+    )
+
+    rank = comm.rank
+    with h5py.File(filename, "w", driver="mpio", comm=comm) as h5_file:
+        h5_file.attrs["type"] = "hmf"
+        h5_file.attrs["version"] = "0.1"
+        grid = h5_file.create_group("domain").create_group("grid")
+
+        # the first rank with points determines their shape and type
+        shape, dtype = next(
+            (r["points"] for r in ranks if r["num_points"] > 0), ranks[0]["points"]
+        )
+        geo = grid.create_dataset("Geometry", (num_points,) + tuple(shape), dtype=dtype)
+        geo.attrs["GeometryType"] = {1: "X", 2: "XY", 3: "XYZ"}[shape[0]]
+        _write_slab(geo, point_offsets[rank], mesh.points)
+
+        for k, key in enumerate(cell_types):
+            _, shape, dtype = next(r["cells"][key] for r in ranks if key in r["cells"])
+            topo = grid.create_dataset(
+                f"Topology{k}", (num_cells[key],) + tuple(shape), dtype=dtype
+            )
+            topo.attrs["TopologyType"] = meshio_to_xdmf_type[key][0]
+            if key in mesh.cells:
+                # local to global point numbering
+                values = mesh.cells[key] + mesh.cells[key].dtype.type(
+                    point_offsets[rank]
+                )
+                _write_slab(topo, cell_offsets[key][rank], values)
+
+        names = _union([r["point_data"] for r in ranks])
+        for name in names:
+            shape, dtype = next(
+                r["point_data"][name] for r in ranks if name in r["point_data"]
+            )
+            att = create_attribute(
+                grid, name, "Node", (num_points,) + tuple(shape), dtype
+            )
+            if name in mesh.point_data:
+                _write_slab(att, point_offsets[rank], mesh.point_data[name])
+
+        names = _union([r["cell_data"] for r in ranks])
+        num_raw = sum(num_cells.values())
+        for name in names:
+            shape, dtype = next(
+                r["cell_data"][name] for r in ranks if name in r["cell_data"]
+            )
+            att = create_attribute(grid, name, "Cell", (num_raw,) + tuple(shape), dtype)
+            for key in mesh.cells:
+                if name in mesh.cell_data.get(key, {}):
+                    start = raw_offsets[key] + cell_offsets[key][rank]
+                    _write_slab(att, start, mesh.cell_data[key][name])
+        # collective; every rank writes the same index
+        write_index(grid)
+
+        # [start, stop) of every rank's points and cells, used by read_parallel
+        partitions = numpy.empty((len(ranks), 1 + len(cell_types), 2), dtype=int)
+        partitions[:, 0, 0] = point_offsets
+        partitions[:, 0, 1] = point_offsets + [r["num_points"] for r in ranks]
+        for k, key in enumerate(cell_types):
+            counts = [r["cells"][key][0] if key in r["cells"] else 0 for r in ranks]
+            partitions[:, k + 1, 0] = cell_offsets[key]
+            partitions[:, k + 1, 1] = cell_offsets[key] + counts
+        dset = grid.create_dataset("Partitions", partitions.shape, dtype=int)
+        if rank == 0:
+            dset[...] = partitions
+
+
+def read_parallel(filename, comm):
+    """Collectively read an HMF file; every rank gets its own part, with cells in
+    local point numbering.
+
+    For files written by write_parallel, the ranks get contiguous groups of the
+    stored partitions. Otherwise, every cell block is split evenly and each rank reads
+    the range of points its cells refer to.
+    """
+    _check_mpi()
+    rank, size = comm.rank, comm.size
+    with HmfFile(filename, driver="mpio", comm=comm) as f:
+        grid = f._grid
+        cell_types = list(f.cells)
+
+        cell_ranges = {}
+        if "Partitions" in grid:
+            partitions = grid["Partitions"][()]
+            n = len(partitions)
+            a, b = rank * n // size, (rank + 1) * n // size
+            if a == b:
+                point_range = (0, 0)
+                cell_ranges = {key: (0, 0) for key in cell_types}
+            else:
+                point_range = (partitions[a:b, 0, 0].min(), partitions[a:b, 0, 1].max())
+                for k, key in enumerate(cell_types):
+                    cell_ranges[key] = (
+                        partitions[a:b, k + 1, 0].min(),
+                        partitions[a:b, k + 1, 1].max(),
+                    )
+        else:
+            for key, value in f.cells.items():
+                n = len(value)
+                cell_ranges[key] = (rank * n // size, (rank + 1) * n // size)
+            point_range = None
+
+        cells = {key: f.cells[key][slice(*cell_ranges[key])] for key in cell_types}
+        if point_range is None:
+            nonempty = [c for c in cells.values() if c.size > 0]
+            if nonempty:
+                point_range = (
+                    min(c.min() for c in nonempty),
+                    max(c.max() for c in nonempty) + 1,
+                )
+            else:
+                point_range = (0, 0)
+
+        p0, p1 = point_range
+        cells = {key: value - value.dtype.type(p0) for key, value in cells.items()}
+
+        raw_offsets = dict(
+            zip(cell_types, _exclusive_sum([len(f.cells[key]) for key in cell_types]))
+        )
+        cell_data = {key: {} for key in cell_types}
+        for name, values in f.cell_data_raw.items():
+            for key in cell_types:
+                c0, c1 = cell_ranges[key]
+                r = raw_offsets[key]
+                cell_data[key][name] = values[r + c0 : r + c1]
+
+        return meshio.Mesh(
+            f.points[p0:p1],
+            cells,
+            point_data={name: values[p0:p1] for name, values in f.point_data.items()},
+            cell_data=cell_data,
+            field_data=f.field_data,
+        )
+
+
+def _offsets(counts, offsets):
+    if all(o is None for o in offsets):
+        return _exclusive_sum(counts)
+    if any(o is None for o in offsets):
+        raise ValueError("Either all or no ranks must specify offsets")
+    return numpy.array(offsets, dtype=int)
+
+
+def _union(dicts):
+    out = []
+    for d in dicts:
+        out += [name for name in d if name not in out]
+    return out
+
+
+def _write_slab(dataset, start, values):
+    # independent I/O; ranks without data don't touch the dataset
+    if len(values) > 0:
+        dataset[start : start + len(values)] = values
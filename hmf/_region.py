@@ -0,0 +1,155 @@
+import numpy
+
+import meshio
+
+from ._file import HmfFile, _select
+
+# The spatial index splits every Topology{k} into buckets of consecutive cells and
+# stores the bounding box of each in SpatialIndex/Buckets{k}, shape (n, 2, dim), with
+# the attribute BucketSize. The boxes are only tight if the cells are sorted
+# spatially, e.g., with reorder="hilbert".
+default_bucket_size = 2**12
+
+# Rows of a dataset that are closer than this are read with one slice.
+_max_gap = 2**10
+
+
+def write_spatial_index(grid, points, cells, bucket_size=default_bucket_size):
+    points = numpy.asarray(points)
+    group = grid.create_group("SpatialIndex")
+    group.attrs["BucketSize"] = bucket_size
+    for k, value in enumerate(cells.values()):
+        group.create_dataset(
+            f"Buckets{k}", data=_bucket_boxes(points, numpy.asarray(value), bucket_size)
+        )
+
+
+def _bucket_boxes(points, cells, bucket_size):
+    num_buckets = -(-len(cells) // bucket_size)
+    boxes = numpy.empty((num_buckets, 2, points.shape[1]))
+    # a few buckets at a time to bound the temporary memory
+    step = bucket_size * max(1, 2**20 // max(1, bucket_size * cells.shape[1]))
+    for start in range(0, len(cells), step):
+        coords = points[cells[start : start + step]]
+        starts = numpy.arange(0, len(coords), bucket_size)
+        b = start // bucket_size
+        boxes[b : b + len(starts), 0] = numpy.minimum.reduceat(
+            coords.min(axis=1), starts
+        )
+        boxes[b : b + len(starts), 1] = numpy.maximum.reduceat(
+            coords.max(axis=1), starts
+        )
+    return boxes
+
+
+def _cell_ranges(index, k, num_cells, lower, upper):
+    # [start, stop) of the cells in buckets that overlap the box, merged where
+    # adjacent. Without an index, all cells.
+    if index is None:
+        return [(0, num_cells)] if num_cells > 0 else []
+    bucket_size = int(index.attrs["BucketSize"])
+    boxes = index[f"Buckets{k}"][()]
+    dim = min(boxes.shape[2], len(lower))
+    overlaps = numpy.all(
+        (boxes[:, 1, :dim] >= lower[:dim]) & (boxes[:, 0, :dim] <= upper[:dim]),
+        axis=1,
+    )
+    ranges = []
+    for b in numpy.flatnonzero(overlaps):
+        start, stop = b * bucket_size, min((b + 1) * bucket_size, num_cells)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], stop)
+        else:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _unique_ids(arrays):
+    # sorted point ids used by the cell blocks; int64 even if there are none
+    ids = [numpy.asarray(a, dtype=numpy.int64).ravel() for a in arrays]
+    return numpy.unique(numpy.concatenate([numpy.empty(0, dtype=numpy.int64)] + ids))
+
+
+def _take_rows(array, rows):
+    # array[rows] for sorted unique rows, read as a few slices
+    if len(rows) == 0:
+        return numpy.empty((0,) + array.shape[1:], dtype=array.dtype)
+    breaks = numpy.flatnonzero(numpy.diff(rows) > _max_gap) + 1
+    out = []
+    for run in numpy.split(rows, breaks):
+        block = array[int(run[0]) : int(run[-1]) + 1]
+        out.append(block[run - run[0]])
+    return numpy.concatenate(out)
+
+
+def read_region(
+    filename, bbox, grid=None, point_data=None, cell_data=None, workers=None
+):
+    """Read the cells whose bounding box overlaps `bbox` = (lower, upper), with the
+    points they use, renumbered.
+
+    With a spatial index (see write), only the cells in overlapping buckets and the
+    points they refer to are read. Without, all cells are read.
+    """
+    lower, upper = (numpy.asarray(b, dtype=float) for b in bbox)
+    with HmfFile(filename, workers=workers, grid=grid) as f:
+        point_data_names = _select(point_data, f.point_data, "point data")
+        cell_data_names = _select(cell_data, f.cell_data_raw, "cell data")
+        dim = f.points.shape[1]
+        if lower.shape != upper.shape or lower.shape[0] < dim:
+            raise ValueError(
+                f"The points have {dim} coordinates, "
+                f"but the box corners {lower.shape[0]} and {upper.shape[0]}"
+            )
+        lower, upper = lower[:dim], upper[:dim]
+        index = f._grid.get("SpatialIndex")
+
+        # candidate cells as (cell type, raw offset, start, cells)
+        blocks = []
+        raw_offset = 0
+        for k, (key, value) in enumerate(f.cells.items()):
+            for start, stop in _cell_ranges(index, k, len(value), lower, upper):
+                blocks.append((key, raw_offset, start, value[start:stop]))
+            raw_offset += len(value)
+
+        ids = _unique_ids(c for *_, c in blocks)
+        coords = _take_rows(f.points, ids)
+
+        selected = []
+        for key, raw_offset, start, cells in blocks:
+            c = coords[numpy.searchsorted(ids, cells)]
+            is_inside = numpy.all(
+                (c.max(axis=1) >= lower) & (c.min(axis=1) <= upper), axis=1
+            )
+            selected.append((key, raw_offset, start, cells[is_inside], is_inside))
+
+        used = _unique_ids(c for _, _, _, c, _ in selected)
+        points = coords[numpy.searchsorted(ids, used)]
+
+        cells = {}
+        cell_data = {}
+        for key, raw_offset, start, block, is_inside in selected:
+            block = numpy.searchsorted(used, block)
+            data = {}
+            for name in cell_data_names:
+                r = raw_offset + start
+                data[name] = f.cell_data_raw[name][r : r + len(is_inside)][is_inside]
+            if key in cells:
+                cells[key] = numpy.concatenate([cells[key], block])
+                for name in cell_data_names:
+                    cell_data[key][name] = numpy.concatenate(
+                        [cell_data[key][name], data[name]]
+                    )
+            else:
+                cells[key] = block
+                cell_data[key] = data
+
+        return meshio.Mesh(
+            points,
+            cells,
+            point_data={
+                name: _take_rows(f.point_data[name], used) for name in point_data_names
+            },
+            cell_data=cell_data,
+            field_data=f.field_data,
+        )
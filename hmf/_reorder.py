@@ -0,0 +1,158 @@
+import numpy
+
+import meshio
+
+curves = ["hilbert", "morton"]
+
+# Keys are computed in blocks of this many points to bound the temporary memory.
+_block_size = 2**16
+
+
+def _spread_bits(x, dim):
+    # Insert dim - 1 zero bits between the bits of x (uint64).
+    if dim == 1:
+        return x
+    if dim == 2:
+        masks = [
+            (16, 0x0000FFFF0000FFFF),
+            (8, 0x00FF00FF00FF00FF),
+            (4, 0x0F0F0F0F0F0F0F0F),
+            (2, 0x3333333333333333),
+            (1, 0x5555555555555555),
+        ]
+    else:
+        assert dim == 3
+        masks = [
+            (32, 0x001F00000000FFFF),
+            (16, 0x001F0000FF0000FF),
+            (8, 0x100F00F00F00F00F),
+            (4, 0x10C30C30C30C30C3),
+            (2, 0x1249249249249249),
+        ]
+    for shift, mask in masks:
+        x = (x | (x << numpy.uint64(shift))) & numpy.uint64(mask)
+    return x
+
+
+def _interleave(coords, dim):
+    # The first coordinate gets the most significant bit of every group.
+    key = numpy.zeros(len(coords[0]), dtype=numpy.uint64)
+    for i, x in enumerate(coords):
+        key |= _spread_bits(x, dim) << numpy.uint64(dim - 1 - i)
+    return key
+
+
+def _hilbert_transpose(coords, bits):
+    # Skilling's transform of the coordinates to the "transposed" Hilbert index,
+    # vectorized over all points with bit masks instead of branches. See J. Skilling,
+    # Programming the Hilbert curve, AIP Conf. Proc. 707 (2004).
+    x = [c.copy() for c in coords]
+    n = len(x)
+    one = numpy.uint64(1)
+    for b in range(bits - 1, 0, -1):
+        p = numpy.uint64((1 << b) - 1)
+        for i in range(n):
+            # all ones where bit b of x[i] is set, zero elsewhere
+            mask = numpy.uint64(0) - ((x[i] >> numpy.uint64(b)) & one)
+            if i == 0:
+                x[0] ^= p & mask
+            else:
+                t = (x[0] ^ x[i]) & p & ~mask
+                x[0] ^= (p & mask) | t
+                x[i] ^= t
+
+    # Gray encode
+    for i in range(1, n):
+        x[i] ^= x[i - 1]
+    t = numpy.zeros(len(x[0]), dtype=numpy.uint64)
+    for b in range(bits - 1, 0, -1):
+        mask = numpy.uint64(0) - ((x[n - 1] >> numpy.uint64(b)) & one)
+        t ^= numpy.uint64((1 << b) - 1) & mask
+    for i in range(n):
+        x[i] ^= t
+    return x
+
+
+def curve_keys(points, lower, upper, curve="hilbert"):
+    """Position of the points along a space-filling curve through the box
+    [lower, upper], as uint64.
+    """
+    points = numpy.asarray(points)
+    dim = points.shape[1]
+    bits = {1: 32, 2: 32, 3: 21}[dim]
+    lower = numpy.asarray(lower, dtype=float)
+    extent = numpy.asarray(upper, dtype=float) - lower
+    scale = numpy.where(
+        extent > 0, (2**bits - 1) / numpy.where(extent > 0, extent, 1), 0
+    )
+
+    keys = numpy.empty(len(points), dtype=numpy.uint64)
+    for start in range(0, len(points), _block_size):
+        block = points[start : start + _block_size]
+        q = ((block - lower) * scale).clip(0, 2**bits - 1).astype(numpy.uint64)
+        coords = [q[:, i] for i in range(dim)]
+        if curve == "hilbert":
+            coords = _hilbert_transpose(coords, bits)
+        elif curve not in curves:
+            raise ValueError(f"Unknown curve {curve!r}")
+        keys[start : start + len(block)] = _interleave(coords, dim)
+    return keys
+
+
+def _cell_keys(points, cells, lower, upper, curve):
+    keys = numpy.empty(len(cells), dtype=numpy.uint64)
+    for start in range(0, len(cells), _block_size):
+        block = cells[start : start + _block_size]
+        centroids = points[block].mean(axis=1)
+        keys[start : start + len(block)] = curve_keys(centroids, lower, upper, curve)
+    return keys
+
+
+def _inverse(perm):
+    inv = numpy.empty_like(perm)
+    inv[perm] = numpy.arange(len(perm), dtype=perm.dtype)
+    return inv
+
+
+def reorder(mesh, curve="hilbert"):
+    """Sort the points along a space-filling curve ("hilbert" or "morton") and the
+    cells of every block by the curve position of their centroids.
+
+    Returns the reordered mesh, the point permutation and a dictionary with the cell
+    permutation of every block. Point k of the new mesh is point
+    point_permutation[k] of the old one; likewise for the cells.
+    """
+    points = numpy.asarray(mesh.points)
+    if len(points) == 0:
+        lower = upper = numpy.zeros(points.shape[1])
+    else:
+        lower = points.min(axis=0)
+        upper = points.max(axis=0)
+
+    point_perm = numpy.argsort(curve_keys(points, lower, upper, curve), kind="stable")
+    new_points = points[point_perm]
+    new_index = _inverse(point_perm)
+
+    cells = {}
+    cell_perms = {}
+    for key, value in mesh.cells.items():
+        value = new_index[value]
+        perm = numpy.argsort(
+            _cell_keys(new_points, value, lower, upper, curve), kind="stable"
+        )
+        cells[key] = value[perm]
+        cell_perms[key] = perm
+
+    out = meshio.Mesh(
+        new_points,
+        cells,
+        point_data={
+            name: values[point_perm] for name, values in mesh.point_data.items()
+        },
+        cell_data={
+            key: {name: values[cell_perms[key]] for name, values in d.items()}
+            for key, d in mesh.cell_data.items()
+        },
+        field_data=mesh.field_data,
+    )
+    return out, point_perm, cell_perms
@@ -0,0 +1,168 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+
+import h5py
+import numpy
+
+from ._attributes import write_index
+from ._file import LazyArray
+from ._storage import StoragePolicy
+
+
+def repack(
+    filename,
+    outfile=None,
+    compression="gzip",
+    compression_opts=None,
+    shuffle=None,
+    chunks=None,
+    index_dtype=None,
+    float_dtype=None,
+    prune_z_0=False,
+):
+    """Copy an HMF file dataset by dataset, block by block, with new filters and
+    chunks. Without `outfile`, the result atomically replaces the original.
+
+    By default, the data types are kept; see StoragePolicy for `index_dtype` and
+    `float_dtype`. With `prune_z_0`, the z-coordinate of 3D points is dropped if it is
+    0 everywhere.
+    """
+    policy = StoragePolicy(
+        compression, compression_opts, shuffle, chunks, index_dtype, float_dtype
+    )
+    target = filename if outfile is None else outfile
+
+    # Write to a temporary file in the target directory so that the final rename
+    # doesn't cross file systems. A crash leaves the original untouched.
+    fd, tmp = tempfile.mkstemp(
+        suffix=".tmp",
+        prefix=os.path.basename(target) + ".",
+        dir=os.path.dirname(os.path.abspath(target)),
+    )
+    os.close(fd)
+    try:
+        with h5py.File(filename, "r") as src, h5py.File(tmp, "w") as dst:
+            _copy_group(src, dst, policy, prune_z_0)
+        shutil.copymode(filename, tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def repack_many(filenames, max_workers=None, **kwargs):
+    """Repack many files in a process pool. Returns a dictionary mapping each file name
+    to the exception it raised, or None.
+    """
+    if max_workers == 1:
+        return {filename: _try_repack(filename, kwargs) for filename in filenames}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = [
+            executor.submit(_try_repack, filename, kwargs) for filename in filenames
+        ]
+        return {
+            filename: future.result() for filename, future in zip(filenames, futures)
+        }
+
+
+def _try_repack(filename, kwargs):
+    try:
+        repack(filename, **kwargs)
+    except Exception as e:
+        return e
+    return None
+
+
+def _copy_attrs(src, dst):
+    for key, value in src.attrs.items():
+        dst.attrs[key] = value
+
+
+def _copy_group(src, dst, policy, prune_z_0=False):
+    _copy_attrs(src, dst)
+    for key, value in src.items():
+        if isinstance(value, h5py.Group):
+            _copy_group(value, dst.create_group(key), policy, prune_z_0)
+        else:
+            _copy_dataset(value, dst, key, policy, prune_z_0)
+    if "Index" in src and src.name.endswith("/Attributes"):
+        # the stored dtypes may have changed
+        write_index(dst.parent)
+
+
+def _dataset_kind(name):
+    if name == "Geometry":
+        return "Geometry"
+    if name[:8] == "Topology":
+        return "Topology"
+    return "Attribute"
+
+
+def is_z_zero(points, tol=1.0e-13):
+    # True for 3D points whose z-coordinate is 0 everywhere; reads block by block
+    if points.ndim != 2 or points.shape[1] != 3:
+        return False
+    if not isinstance(points, LazyArray):
+        # decodes encoded datasets
+        points = LazyArray(points)
+    for s in points.blocks():
+        if not numpy.all(numpy.abs(points[s, 2]) < tol):
+            return False
+    return True
+
+
+def _copy_dataset(src, group, key, policy, prune_z_0=False, num_points=None):
+    # `num_points` is needed to pick the index type of Topology datasets; it defaults
+    # to the length of the Geometry next to them.
+    if src.shape is None or src.ndim == 0 or src.dtype.kind not in "biufc":
+        # scalars and meta data like strings: copy as is
+        dst = group.create_dataset(key, data=src[()])
+        _copy_attrs(src, dst)
+        return
+
+    kind = _dataset_kind(key)
+    dtype = src.dtype
+    shape = src.shape
+    if num_points is None and "Geometry" in src.parent:
+        num_points = len(src.parent["Geometry"])
+    if kind == "Topology":
+        value_range = None
+        if policy.index_dtype is not None and num_points is not None:
+            value_range = (0, num_points - 1)
+            for s in LazyArray(src).blocks():
+                block = src[s]
+                value_range = (
+                    min(value_range[0], block.min()),
+                    max(value_range[1], block.max()),
+                )
+        dtype = policy.storage_dtype(kind, dtype, value_range)
+    elif kind == "Geometry" or key == "Attribute" or "Center" in src.attrs:
+        # points and attributes, but not meta data like time values
+        dtype = policy.storage_dtype(kind, dtype)
+
+    if kind == "Geometry" and prune_z_0 and is_z_zero(src):
+        shape = (shape[0], 2)
+
+    kwargs = policy.dataset_kwargs(kind, shape, dtype)
+    if src.maxshape != src.shape and policy.chunks is not False:
+        # Keep appendable datasets appendable, unless contiguous datasets were asked
+        # for (e.g., for memory-mapping); those can't be resized.
+        kwargs["maxshape"] = src.maxshape[:1] + shape[1:]
+        if kwargs.get("chunks") is None:
+            kwargs["chunks"] = src.chunks[:1] + shape[1:]
+
+    dst = group.create_dataset(key, shape=shape, dtype=dtype, **kwargs)
+    align = 1 if dst.chunks is None else dst.chunks[0]
+    for s in LazyArray(src).blocks(align=align):
+        block = src[s]
+        if shape != src.shape:
+            block = block[:, :2]
+        dst[s] = block.astype(dtype, copy=False)
+    _copy_attrs(src, dst)
+    if shape != src.shape:
+        dst.attrs["GeometryType"] = "XY"
+    if dtype != src.dtype and "OriginalDtype" not in dst.attrs:
+        dst.attrs["OriginalDtype"] = src.dtype.str
@@ -0,0 +1,190 @@
+import numpy
+
+from ._encoding import encode as _encode
+from ._encoding import encodings
+
+# Target chunk sizes in bytes. Connectivity is mostly read as a whole, so fewer and
+# larger chunks pay off there; geometry and attributes are also read partially.
+default_chunk_bytes = {
+    "Geometry": 2**20,
+    "Topology": 2**22,
+    "Attribute": 2**20,
+}
+
+# compression filters that need the hdf5plugin package
+plugin_compressions = ["blosc", "zstd", "lz4"]
+
+
+class StoragePolicy:
+    """Filters and chunk shapes for the datasets in an HMF file.
+
+    `chunks` can be None (per-kind defaults; contiguous if uncompressed), True (let
+    h5py decide), False (contiguous, uncompressed only), an int (target chunk size in
+    bytes), a chunk shape, or a dictionary mapping "Geometry", "Topology" and
+    "Attribute" to any of these.
+
+    `index_dtype` is the integer type of the Topology datasets; "auto" picks the
+    smallest unsigned type that holds all point indices, None keeps the type of the
+    data. With `float_dtype` (e.g., "float32"), points and floating-point data are
+    stored with lower precision. The original type is kept in the "OriginalDtype"
+    attribute of every converted dataset.
+
+    `encoding` applies to points and fields: "predictive" stores differences to the
+    previous row (lossless); "quantize" additionally rounds floating-point data to
+    within `tolerance`, which can also be a dictionary mapping "Geometry" and
+    "Attribute" to tolerances. See _encoding.py.
+    """
+
+    def __init__(
+        self,
+        compression="gzip",
+        compression_opts=None,
+        shuffle=None,
+        chunks=None,
+        index_dtype="auto",
+        float_dtype=None,
+        encoding=None,
+        tolerance=None,
+    ):
+        if encoding not in encodings:
+            raise ValueError(f"Unknown encoding {encoding!r}")
+        if encoding == "quantize" and tolerance is None:
+            raise ValueError("Quantization needs a tolerance")
+        tolerances = tolerance.values() if isinstance(tolerance, dict) else [tolerance]
+        if any(t is not None and not t > 0 for t in tolerances):
+            raise ValueError(f"Tolerances must be positive, not {tolerance!r}")
+        if compression in plugin_compressions:
+            try:
+                import hdf5plugin  # noqa: F401
+            except ImportError:
+                raise ValueError(
+                    f"Compression {compression!r} requires the hdf5plugin package"
+                )
+        self.compression = compression
+        self.compression_opts = compression_opts
+        # The shuffle filter makes the bytes of int64/float64 values much easier to
+        # compress. Blosc shuffles by itself.
+        if shuffle is None:
+            shuffle = compression is not None and compression != "blosc"
+        self.shuffle = shuffle
+        self.chunks = chunks
+        self.index_dtype = index_dtype
+        self.float_dtype = None if float_dtype is None else numpy.dtype(float_dtype)
+        self.encoding = encoding
+        self.tolerance = tolerance
+
+    def storage_dtype(self, kind, dtype, value_range=None):
+        # `value_range` is the (min, max) of the data; needed for "auto" indices and
+        # checked against explicit ones
+        dtype = numpy.dtype(dtype)
+        if kind == "Topology":
+            if self.index_dtype is None or dtype.kind not in "iu":
+                return dtype
+            if self.index_dtype != "auto":
+                t = numpy.dtype(self.index_dtype)
+                info = numpy.iinfo(t)
+                if value_range is not None and not (
+                    info.min <= value_range[0] and value_range[1] <= info.max
+                ):
+                    raise ValueError(
+                        f"Point indices {value_range[0]}..{value_range[1]} don't fit "
+                        f"into index_dtype {t}"
+                    )
+                return t
+            if value_range is None or value_range[0] < 0:
+                return dtype
+            for t in [numpy.uint8, numpy.uint16, numpy.uint32]:
+                if value_range[1] <= numpy.iinfo(t).max:
+                    return numpy.dtype(t)
+            return numpy.dtype(numpy.uint64) if dtype.kind == "u" else dtype
+
+        if (
+            self.float_dtype is not None
+            and dtype.kind == "f"
+            and dtype.itemsize > self.float_dtype.itemsize
+        ):
+            return self.float_dtype
+        return dtype
+
+    def dataset_kwargs(self, kind, shape, dtype, resizable=False):
+        # Resizable datasets (for appending along the first axis) are always chunked.
+        if not resizable and (len(shape) == 0 or shape[0] == 0):
+            # HDF5 can't chunk or filter empty datasets
+            return {}
+
+        chunks = self.chunks
+        if isinstance(chunks, dict):
+            chunks = chunks.get(kind)
+
+        is_filtered = self.compression is not None or self.shuffle
+        if chunks is None or chunks is False:
+            if not is_filtered and not resizable:
+                # contiguous storage
+                return {}
+            if chunks is False and is_filtered:
+                raise ValueError("Compressed datasets must be chunked")
+            chunks = default_chunk_bytes[kind]
+
+        if isinstance(chunks, int) and not isinstance(chunks, bool):
+            row_bytes = numpy.dtype(dtype).itemsize * int(numpy.prod(shape[1:]))
+            rows = max(1, chunks // row_bytes)
+            if not resizable:
+                rows = min(rows, shape[0])
+            chunks = (rows,) + tuple(shape[1:])
+
+        kwargs = {"chunks": chunks}
+        if resizable:
+            kwargs["maxshape"] = (None,) + tuple(shape[1:])
+        if is_filtered:
+            kwargs["shuffle"] = self.shuffle
+            kwargs.update(self._compression_kwargs())
+        return kwargs
+
+    def _compression_kwargs(self):
+        if self.compression not in plugin_compressions:
+            return {
+                "compression": self.compression,
+                "compression_opts": self.compression_opts,
+            }
+
+        import hdf5plugin
+
+        level = self.compression_opts
+        if self.compression == "blosc":
+            f = hdf5plugin.Blosc(
+                cname="lz4",
+                clevel=5 if level is None else level,
+                shuffle=hdf5plugin.Blosc.SHUFFLE,
+            )
+        elif self.compression == "zstd":
+            f = hdf5plugin.Zstd(clevel=3 if level is None else level)
+        else:
+            assert self.compression == "lz4"
+            f = hdf5plugin.LZ4()
+        return dict(f)
+
+    def create_dataset(self, group, name, kind, data, value_range=None, encode=False):
+        # `encode` for points and fields, if an encoding was chosen
+        data = numpy.asarray(data)
+        dtype = self.storage_dtype(kind, data.dtype, value_range)
+        values = data.astype(dtype, copy=False)
+        kwargs = self.dataset_kwargs(kind, data.shape, dtype)
+        encoded = None
+        if encode and self.encoding is not None:
+            tolerance = self.tolerance
+            if isinstance(tolerance, dict):
+                tolerance = tolerance.get(kind)
+            encoding = self.encoding if tolerance is not None else "predictive"
+            # restart the prediction with every chunk, if the chunk shape is known
+            chunks = kwargs.get("chunks")
+            block = chunks[0] if isinstance(chunks, (tuple, list)) else None
+            encoded = _encode(values, encoding, tolerance, block)
+        if encoded is not None:
+            values, encoding_attrs = encoded
+
+        dset = group.create_dataset(name, data=values, **kwargs)
+        if encoded is not None:
+            dset.attrs.update(encoding_attrs)
+        if dtype != data.dtype:
+            dset.attrs["OriginalDtype"] = data.dtype.str
+        return dset
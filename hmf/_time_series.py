@@ -0,0 +1,132 @@
+import h5py
+
+from ._attributes import field_maps, write_attribute
+from ._common import cell_data_from_raw, raw_from_cell_data
+from ._file import HmfFile, LazyArray
+from ._main import write_cells, write_points
+from ._storage import StoragePolicy
+
+
+class TimeSeriesWriter:
+    """Writes Geometry and Topology once and appends one group of attributes per time
+    step, TimeSeries/Step{k}, laid out like grid/Attributes. The file stays open
+    between steps.
+    """
+
+    def __init__(
+        self,
+        filename,
+        compression="gzip",
+        compression_opts=None,
+        shuffle=None,
+        chunks=None,
+        index_dtype="auto",
+        float_dtype=None,
+    ):
+        self.filename = filename
+        self._policy = StoragePolicy(
+            compression, compression_opts, shuffle, chunks, index_dtype, float_dtype
+        )
+
+    def __enter__(self):
+        self._file = h5py.File(self.filename, "w")
+        self._file.attrs["type"] = "hmf"
+        self._file.attrs["version"] = "0.1"
+        domain = self._file.create_group("domain")
+        self._grid = domain.create_group("grid")
+        self._time_series = self._grid.create_group("TimeSeries")
+        # all time values in one dataset so readers get them with a single read
+        self._times = self._time_series.create_dataset(
+            "Time", shape=(0,), maxshape=(None,), dtype=float, chunks=(1024,)
+        )
+        return self
+
+    def __exit__(self, *args):
+        self._file.close()
+
+    def write_points_cells(self, points, cells):
+        write_points(self._grid, points, self._policy)
+        write_cells(cells, self._grid, self._policy, len(points))
+        self._file.flush()
+
+    def write_data(self, t, point_data=None, cell_data=None):
+        data = []
+        if point_data is not None:
+            data += [(name, "Node", values) for name, values in point_data.items()]
+        if cell_data is not None:
+            raw = raw_from_cell_data(cell_data)
+            data += [(name, "Cell", values) for name, values in raw.items()]
+        self._check(data)
+
+        k = len(self._times)
+        step = self._time_series.create_group(f"Step{k}")
+        try:
+            step.attrs["Time"] = t
+            for j, (name, center, values) in enumerate(data):
+                write_attribute(
+                    step, f"Attribute{j}", name, center, values, self._policy
+                )
+        except BaseException:
+            # leave the writer usable for the next step
+            del self._time_series[f"Step{k}"]
+            raise
+
+        # only record the time once the step is complete
+        self._times.resize((k + 1,))
+        self._times[k] = t
+        self._file.flush()
+
+    def _check(self, data):
+        # before anything is written
+        sizes = {}
+        if "Geometry" in self._grid:
+            sizes["Node"] = len(self._grid["Geometry"])
+            sizes["Cell"] = sum(
+                len(value) for key, value in self._grid.items() if key[:8] == "Topology"
+            )
+        names = set()
+        for name, center, values in data:
+            if name in names:
+                raise ValueError(f"Point and cell data share the name {name!r}")
+            names.add(name)
+            if center in sizes and len(values) != sizes[center]:
+                what = "points" if center == "Node" else "cells"
+                raise ValueError(
+                    f"Data {name!r} has {len(values)} entries, "
+                    f"but there are {sizes[center]} {what}"
+                )
+
+
+class TimeSeriesReader:
+    def __init__(self, filename):
+        self._file = HmfFile(filename)
+        self._time_series = self._file._grid["TimeSeries"]
+        self.times = self._time_series["Time"][()]
+        self.num_steps = len(self.times)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def read_points_cells(self):
+        points = self._file.points.read()
+        cells = {key: value.read() for key, value in self._file.cells.items()}
+        return points, cells
+
+    def read_data(self, k):
+        if not 0 <= k < self.num_steps:
+            raise IndexError(f"Step {k} out of range (0, {self.num_steps})")
+        step = self._time_series[f"Step{k}"]
+
+        point_data, cell_data_raw = field_maps(
+            step, lambda dataset: LazyArray(dataset, **self._file._array_kwargs)
+        )
+        point_data = {name: value.read() for name, value in point_data.items()}
+        cell_data_raw = {name: value.read() for name, value in cell_data_raw.items()}
+        cell_data = cell_data_from_raw(self._file.cells, cell_data_raw)
+        return self.times[k], point_data, cell_data
@@ -0,0 +1,198 @@
+import collections
+import concurrent.futures
+import os
+
+import h5py
+import numpy
+
+from ._file import HmfFile, LazyArray
+
+
+class ValidationReport:
+    def __init__(self, n_points):
+        self.n_points = n_points
+        # per cell type: number of indices < 0 and >= n_points
+        self.negative_indices = collections.OrderedDict()
+        self.out_of_range_indices = collections.OrderedDict()
+        self.orphaned_points = 0
+        # None if the check wasn't requested
+        self.duplicate_points = None
+        # per dataset: number of NaN and Inf entries
+        self.non_finite = collections.OrderedDict()
+
+    @property
+    def is_valid(self):
+        return (
+            not any(self.negative_indices.values())
+            and not any(self.out_of_range_indices.values())
+            and self.orphaned_points == 0
+            and not self.duplicate_points
+            and not any(self.non_finite.values())
+        )
+
+    def __str__(self):
+        lines = []
+        for key in self.negative_indices:
+            neg = self.negative_indices[key]
+            oor = self.out_of_range_indices[key]
+            if neg > 0:
+                lines.append(f"{key}: {neg} negative point indices")
+            if oor > 0:
+                lines.append(f"{key}: {oor} point indices >= {self.n_points}")
+        if self.orphaned_points > 0:
+            lines.append(f"{self.orphaned_points} points are not part of any cell")
+        if self.duplicate_points:
+            lines.append(f"{self.duplicate_points} duplicate points")
+        for name, num in self.non_finite.items():
+            if num > 0:
+                lines.append(f"{name}: {num} NaN/Inf values")
+        if not lines:
+            return "Mesh is valid."
+        return "\n".join(lines)
+
+
+def validate(filename, duplicate_tol=None, max_workers=None, grid=None):
+    filename = os.path.abspath(filename)
+    with HmfFile(filename, grid=grid) as f:
+        n_points = f.num_points
+        report = ValidationReport(n_points)
+
+        tasks = []
+        for key, cells in f.cells.items():
+            report.negative_indices[key] = 0
+            report.out_of_range_indices[key] = 0
+            for s in cells.blocks():
+                tasks.append((_check_cells, filename, cells.name, s, key, n_points))
+
+        arrays = [f.points]
+        arrays += list(f.point_data.values()) + list(f.cell_data_raw.values())
+        for array in arrays:
+            if array.dtype.kind in "fc":
+                report.non_finite[array.name] = 0
+                for s in array.blocks():
+                    tasks.append((_check_finite, filename, array.name, s))
+
+        if duplicate_tol is not None:
+            hashes = numpy.empty(n_points, dtype=numpy.uint64)
+            for s in f.points.blocks():
+                tasks.append((_hash_points, filename, f.points.name, s, duplicate_tol))
+
+        point_is_used = numpy.zeros(n_points, dtype=bool)
+        for task, result in _imap(tasks, max_workers):
+            if task[0] is _check_cells:
+                key = task[4]
+                neg, oor, used = result
+                report.negative_indices[key] += neg
+                report.out_of_range_indices[key] += oor
+                point_is_used[used] = True
+            elif task[0] is _check_finite:
+                report.non_finite[task[2]] += result
+            else:
+                hashes[task[3]] = result
+
+        report.orphaned_points = int(numpy.count_nonzero(~point_is_used))
+        del point_is_used
+
+        if duplicate_tol is not None:
+            report.duplicate_points = _count_duplicates(f.points, hashes, duplicate_tol)
+
+    return report
+
+
+def _imap(tasks, max_workers):
+    # Like Executor.map, but with a bounded number of results in flight. This keeps
+    # the memory of the main process independent of the number of chunks.
+    if max_workers == 1:
+        try:
+            for task in tasks:
+                yield task, _run(task)
+        finally:
+            _close_files()
+        return
+
+    window = 2 * (max_workers or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = collections.deque()
+        for task in tasks:
+            futures.append((task, executor.submit(_run, task)))
+            if len(futures) >= window:
+                task, future = futures.popleft()
+                yield task, future.result()
+        while futures:
+            task, future = futures.popleft()
+            yield task, future.result()
+
+
+_open_files = {}
+
+
+def _get_dataset(filename, name):
+    # Keep the files open in the worker processes; opening is expensive compared to
+    # reading a single chunk.
+    if filename not in _open_files:
+        _open_files[filename] = h5py.File(filename, "r")
+    # LazyArray decodes encoded datasets
+    return LazyArray(_open_files[filename][name])
+
+
+def _close_files():
+    for f in _open_files.values():
+        f.close()
+    _open_files.clear()
+
+
+def _run(task):
+    fun, filename, name = task[:3]
+    return fun(_get_dataset(filename, name), *task[3:])
+
+
+def _check_cells(dataset, s, key, n_points):
+    block = dataset[s]
+    is_negative = block < 0
+    is_out_of_range = block >= n_points
+    used = block[~(is_negative | is_out_of_range)]
+    return (
+        int(numpy.count_nonzero(is_negative)),
+        int(numpy.count_nonzero(is_out_of_range)),
+        numpy.unique(used),
+    )
+
+
+def _check_finite(dataset, s):
+    return int(numpy.count_nonzero(~numpy.isfinite(dataset[s])))
+
+
+def _quantize(points, tol):
+    if tol == 0.0:
+        # exact comparison of the bits, also of float32 points; add 0.0 to unify
+        # -0.0 and 0.0
+        return (points.astype(numpy.float64) + 0.0).view(numpy.int64)
+    return numpy.floor(points / tol + 0.5).astype(numpy.int64)
+
+
+def _hash_points(dataset, s, tol):
+    keys = _quantize(dataset[s], tol).reshape(s.stop - s.start, -1)
+    keys = keys.view(numpy.uint64)
+    h = numpy.full(keys.shape[0], 14695981039346656037, dtype=numpy.uint64)
+    for k in range(keys.shape[1]):
+        h ^= keys[:, k]
+        h *= numpy.uint64(1099511628211)
+    return h
+
+
+def _count_duplicates(points, hashes, tol):
+    # Points are duplicates if their coordinates round to the same multiple of tol.
+    # Only points with colliding hashes are read back for the exact comparison.
+    order = numpy.argsort(hashes, kind="stable")
+    sorted_hashes = hashes[order]
+    is_equal = sorted_hashes[1:] == sorted_hashes[:-1]
+    is_collision = numpy.zeros(len(hashes), dtype=bool)
+    is_collision[1:] |= is_equal
+    is_collision[:-1] |= is_equal
+    candidates = numpy.sort(order[is_collision])
+    if len(candidates) == 0:
+        return 0
+
+    keys = _quantize(points[candidates], tol).reshape(len(candidates), -1)
+    unique_keys = numpy.unique(keys, axis=0)
+    return len(candidates) - len(unique_keys)
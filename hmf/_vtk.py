@@ -0,0 +1,54 @@
+import numpy
+
+import meshio
+
+# Cell arrays for the ParaView plugin (scripts/paraview-hmf-plugin.py), kept here so
+# that they can be used and tested without VTK.
+meshio_to_vtk_type = meshio.vtk._vtk.meshio_to_vtk_type
+
+
+def cell_arrays(cells, num_points):
+    # Preallocate the VTK arrays and fill them block by block. 32-bit ids suffice for
+    # most meshes and halve the memory.
+    num_cells = sum(len(block) for block in cells.values())
+    num_conn = sum(block.size for block in cells.values())
+    id_dtype = numpy.int32 if max(num_conn, num_points) < 2**31 else numpy.int64
+
+    cell_types = numpy.empty(num_cells, dtype=numpy.ubyte)
+    offsets = numpy.empty(num_cells + 1, dtype=id_dtype)
+    connectivity = numpy.empty(num_conn, dtype=id_dtype)
+    c = 0
+    k = 0
+    for meshio_type, block in cells.items():
+        n, npoints = block.shape
+        cell_types[c : c + n] = meshio_to_vtk_type[meshio_type]
+        offsets[c : c + n] = numpy.arange(k, k + n * npoints, npoints, dtype=id_dtype)
+        connectivity[k : k + block.size] = block.reshape(-1)
+        c += n
+        k += block.size
+    offsets[-1] = k
+    return cell_types, offsets, connectivity
+
+
+def group_by_type(cell_types):
+    # Stable sort, so the cells keep their relative order within each type. Returns the
+    # permutation and the block boundaries in it.
+    perm = numpy.argsort(cell_types, kind="stable")
+    sorted_types = cell_types[perm]
+    is_start = numpy.empty(len(perm), dtype=bool)
+    is_start[:1] = True
+    is_start[1:] = sorted_types[1:] != sorted_types[:-1]
+    bounds = numpy.append(numpy.flatnonzero(is_start), len(perm))
+    return perm, bounds
+
+
+def legacy_cell_arrays(offsets, connectivity):
+    # VTK < 9: [n0, i0, i1, ..., n1, j0, ...] with vtkIdType (int64)
+    num_points_per_cell = numpy.diff(offsets)
+    locations = offsets[:-1].astype(numpy.int64) + numpy.arange(len(offsets) - 1)
+    legacy = numpy.empty(len(connectivity) + len(locations), dtype=numpy.int64)
+    legacy[locations] = num_points_per_cell
+    is_count = numpy.zeros(len(legacy), dtype=bool)
+    is_count[locations] = True
+    legacy[~is_count] = connectivity
+    return locations, legacy
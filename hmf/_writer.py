@@ -0,0 +1,160 @@
+import os
+import tempfile
+
+import h5py
+import numpy
+
+from ._attributes import (
+    attribute_group,
+    create_attribute,
+    next_attribute_key,
+    write_index,
+)
+from ._common import meshio_to_xdmf_type
+from ._file import LazyArray
+from ._storage import StoragePolicy
+
+
+class StreamWriter:
+    """Writes a mesh batch by batch; memory stays at one batch.
+
+    with hmf.StreamWriter("out.hmf") as writer:
+        for points, tetra in batches:
+            writer.append_points(points)
+            writer.append_cells("tetra", tetra)
+            writer.append_data("temperature", ...)
+    """
+
+    def __init__(
+        self,
+        filename,
+        compression="gzip",
+        compression_opts=None,
+        shuffle=None,
+        chunks=None,
+    ):
+        self.filename = filename
+        self._policy = StoragePolicy(compression, compression_opts, shuffle, chunks)
+
+    def __enter__(self):
+        self._file = h5py.File(self.filename, "w")
+        self._file.attrs["type"] = "hmf"
+        self._file.attrs["version"] = "0.1"
+        self._grid = self._file.create_group("domain").create_group("grid")
+        self._geometry = None
+        self._topologies = {}
+        self._point_data = {}
+        # Cell data comes per cell type, but is stored in the order of the Topology
+        # blocks. Collect it in a scratch file and merge on close.
+        fd, self._scratch_filename = tempfile.mkstemp(
+            suffix=".tmp",
+            prefix=os.path.basename(self.filename) + ".",
+            dir=os.path.dirname(os.path.abspath(self.filename)),
+        )
+        os.close(fd)
+        self._scratch = h5py.File(self._scratch_filename, "w")
+        self._cell_data = {}
+        return self
+
+    def __exit__(self, exc_type, *args):
+        try:
+            if exc_type is None:
+                self._finalize()
+        finally:
+            self._scratch.close()
+            os.remove(self._scratch_filename)
+            self._file.close()
+
+    def _append(self, group, key, kind, values):
+        values = numpy.asarray(values)
+        if key in group:
+            dset = group[key]
+            if dset.shape[1:] != values.shape[1:]:
+                raise ValueError(
+                    f"Shape {values.shape} doesn't match {key} with {dset.shape}"
+                )
+        else:
+            kwargs = self._policy.dataset_kwargs(
+                kind, (0,) + values.shape[1:], values.dtype, resizable=True
+            )
+            dset = group.create_dataset(
+                key, shape=(0,) + values.shape[1:], dtype=values.dtype, **kwargs
+            )
+        n = len(dset)
+        dset.resize(n + len(values), axis=0)
+        dset[n:] = values
+        return dset
+
+    def append_points(self, points):
+        self._geometry = self._append(self._grid, "Geometry", "Geometry", points)
+
+    def append_cells(self, cell_type, block):
+        if cell_type in self._topologies:
+            key = self._topologies[cell_type].name.split("/")[-1]
+        else:
+            key = f"Topology{len(self._topologies)}"
+        topo = self._append(self._grid, key, "Topology", block)
+        topo.attrs["TopologyType"] = meshio_to_xdmf_type[cell_type][0]
+        self._topologies[cell_type] = topo
+
+    def append_data(self, name, values, cell_type=None):
+        # point data if cell_type is None, cell data otherwise
+        if cell_type is None:
+            group = attribute_group(self._grid)
+            if name in self._point_data:
+                key = self._point_data[name].name.split("/")[-1]
+            else:
+                key = next_attribute_key(group)
+            att = self._append(group, key, "Attribute", values)
+            att.attrs["Name"] = name
+            att.attrs["Center"] = "Node"
+            self._point_data[name] = att
+        else:
+            key = f"{len(self._cell_data)}"
+            key = self._cell_data.get((name, cell_type), key)
+            self._append(self._scratch, key, "Attribute", values)
+            self._cell_data[(name, cell_type)] = key
+
+    def _finalize(self):
+        if self._geometry is None:
+            raise ValueError("No points were written")
+        num_points = len(self._geometry)
+        dim = self._geometry.shape[1]
+        self._geometry.attrs["GeometryType"] = {1: "X", 2: "XY", 3: "XYZ"}[dim]
+
+        for name, att in self._point_data.items():
+            if len(att) != num_points:
+                raise ValueError(
+                    f"Point data {name!r} has {len(att)} entries, "
+                    f"but there are {num_points} points"
+                )
+
+        names = []
+        for name, _ in self._cell_data:
+            if name not in names:
+                names.append(name)
+        num_cells = sum(len(topo) for topo in self._topologies.values())
+        for name in names:
+            blocks = []
+            for cell_type, topo in self._topologies.items():
+                key = self._cell_data.get((name, cell_type))
+                src = None if key is None else self._scratch[key]
+                if src is None or len(src) != len(topo):
+                    raise ValueError(
+                        f"Cell data {name!r} doesn't match the {cell_type} cells"
+                    )
+                blocks.append(src)
+
+            shape = (num_cells,) + blocks[0].shape[1:]
+            kwargs = self._policy.dataset_kwargs("Attribute", shape, blocks[0].dtype)
+            att = create_attribute(
+                self._grid, name, "Cell", shape, blocks[0].dtype, **kwargs
+            )
+            r = 0
+            for src in blocks:
+                align = 1 if att.chunks is None else att.chunks[0]
+                for s in LazyArray(src).blocks(align=align):
+                    att[r + s.start : r + s.stop] = src[s]
+                r += len(src)
+
+        write_index(self._grid)
@@ -1,7 +1,12 @@
+import h5py
 import numpy as np
 
 import meshio
-from hmf import __email__, __version__, read, write_points_cells
+from hmf import __email__, __version__
+from hmf import open as hmf_open
+from hmf import write
+from hmf._grids import grid_paths
+from hmf._vtk import cell_arrays, group_by_type, legacy_cell_arrays
 from paraview.util.vtkAlgorithm import (
     VTKPythonAlgorithmBase,
     smdomain,
@@ -10,14 +15,25 @@ from paraview.util.vtkAlgorithm import (
     smproxy,
 )
 from vtkmodules.numpy_interface import dataset_adapter as dsa
-from vtkmodules.vtkCommonDataModel import vtkUnstructuredGrid
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.util.vtkConstants import (
+    VTK_TYPE_INT32,
+    VTK_TYPE_INT64,
+    VTK_UNSIGNED_CHAR,
+)
+from vtkmodules.vtkCommonCore import vtkDataArraySelection, vtkVersion
+from vtkmodules.vtkCommonDataModel import (
+    vtkCellArray,
+    vtkCompositeDataSet,
+    vtkMultiBlockDataSet,
+    vtkUnstructuredGrid,
+)
 
 __author__ = "Tianyi Li, Nico Schlömer"
 __copyright__ = f"Copyright (c) 2019-2020 {__author__} <{__email__}>"
 
 paraview_plugin_version = __version__
 
-meshio_to_vtk_type = meshio.vtk._vtk.meshio_to_vtk_type
 vtk_to_meshio_type = meshio.vtk._vtk.vtk_to_meshio_type
 extensions = ["hmf"]
 input_filetypes = ["TMF"]
@@ -30,12 +46,24 @@ input_filetypes = ["TMF"]
     support_reload=False,
 )
 class meshioReader(VTKPythonAlgorithmBase):
+    # Every grid of the file is a block of the output. Only the blocks selected under
+    # "Grids" are read; once read, they are kept until the file name changes. With
+    # ResolutionLevel > 0, the coarse levels of detail stored in the file are shown
+    # instead (or the coarsest there is).
     def __init__(self):
         VTKPythonAlgorithmBase.__init__(
-            self, nInputPorts=0, nOutputPorts=1, outputType="vtkUnstructuredGrid"
+            self, nInputPorts=0, nOutputPorts=1, outputType="vtkMultiBlockDataSet"
         )
         self._filename = None
         self._file_format = None
+        self._grids = []
+        self._blocks = {}
+        self._level = 0
+        self._grid_selection = vtkDataArraySelection()
+        self._grid_selection.AddObserver("ModifiedEvent", self._selection_modified)
+
+    def _selection_modified(self, *args):
+        self.Modified()
 
     @smproperty.stringvector(name="FileName")
     @smdomain.filelist()
@@ -43,88 +71,110 @@ class meshioReader(VTKPythonAlgorithmBase):
     def SetFileName(self, filename):
         if self._filename != filename:
             self._filename = filename
+            self._blocks = {}
             self.Modified()
 
+    @smproperty.intvector(name="ResolutionLevel", default_values=0)
+    @smdomain.intrange(min=0, max=8)
+    def SetResolutionLevel(self, level):
+        if self._level != level:
+            self._level = level
+            self.Modified()
+
+    @smproperty.dataarrayselection(name="Grids")
+    def GetGridSelection(self):
+        return self._grid_selection
+
     @smproperty.stringvector(name="StringInfo", information_only="1")
     def GetStrings(self):
         return input_filetypes
 
     @smproperty.stringvector(name="FileFormat", number_of_elements="1")
-    @smdomain.xml(
-        """
+    @smdomain.xml("""
         <StringListDomain name="list">
             <RequiredProperties>
                 <Property name="StringInfo" function="StringInfo"/>
             </RequiredProperties>
         </StringListDomain>
-        """
-    )
+        """)
     def SetFileFormat(self, file_format):
         if self._file_format != file_format:
             self._file_format = file_format
             self.Modified()
 
+    def RequestInformation(self, request, inInfoVec, outInfoVec):
+        # only the grid names; no data is read here
+        if self._filename is not None:
+            with h5py.File(self._filename, "r") as f:
+                self._grids = grid_paths(f)
+            for name in self._grids:
+                if not self._grid_selection.ArrayExists(name):
+                    self._grid_selection.AddArray(name)
+        return 1
+
     def RequestData(self, request, inInfoVec, outInfoVec):
-        output = dsa.WrapDataObject(vtkUnstructuredGrid.GetData(outInfoVec))
-
-        # Use meshio to read the mesh
-        mesh = read(self._filename)
-        points, cells = mesh.points, mesh.cells
-
-        # Points
-        if points.shape[1] == 2:
-            points = np.hstack([points, np.zeros((len(points), 1))])
-        output.SetPoints(points)
-
-        # Cells, adapted from
-        # https://github.com/nschloe/meshio/blob/master/test/legacy_writer.py
-        cell_types = np.array([], dtype=np.ubyte)
-        cell_offsets = np.array([], dtype=int)
-        cell_conn = np.array([], dtype=int)
-        for meshio_type in cells:
-            vtk_type = meshio_to_vtk_type[meshio_type]
-            ncells, npoints = cells[meshio_type].shape
-            cell_types = np.hstack(
-                [cell_types, np.full(ncells, vtk_type, dtype=np.ubyte)]
-            )
-            offsets = len(cell_conn) + (1 + npoints) * np.arange(ncells, dtype=int)
-            cell_offsets = np.hstack([cell_offsets, offsets])
-            conn = np.hstack(
-                [npoints * np.ones((ncells, 1), dtype=int), cells[meshio_type]]
-            ).flatten()
-            cell_conn = np.hstack([cell_conn, conn])
-        output.SetCells(cell_types, cell_offsets, cell_conn)
-
-        # Point data
-        for name, array in mesh.point_data.items():
-            output.PointData.append(array, name)
-
-        # Cell data
-        def celldata_array(name):
-            array = None
-            for celltype in mesh.cells:
-                values = mesh.cell_data[celltype][name]
-                if array is None:
-                    array = values
-                else:
-                    array = np.concatenate([array, values])
-            return array
-
-        celldata_names = [
-            set(cell_data.keys()) for cell_data in mesh.cell_data.values()
-        ]
-        celldata_names = (
-            set.intersection(*celldata_names) if len(celldata_names) > 0 else []
+        output = vtkMultiBlockDataSet.GetData(outInfoVec)
+        output.SetNumberOfBlocks(len(self._grids))
+        for k, name in enumerate(self._grids):
+            output.GetMetaData(k).Set(vtkCompositeDataSet.NAME(), name)
+            if not self._grid_selection.ArrayIsEnabled(name):
+                output.SetBlock(k, None)
+                continue
+            if (name, self._level) not in self._blocks:
+                self._blocks[name, self._level] = _read_grid(
+                    self._filename, name, self._level
+                )
+            output.SetBlock(k, self._blocks[name, self._level])
+        return 1
+
+
+def _read_grid(filename, grid, level):
+    ugrid = vtkUnstructuredGrid()
+    output = dsa.WrapDataObject(ugrid)
+
+    with hmf_open(filename, grid=grid) as f:
+        level = min(level, f.levels - 1)
+    # VTK takes compact types as they are, and the cells are copied into the id
+    # arrays anyway.
+    with hmf_open(filename, restore_dtype=False, grid=grid, level=level) as f:
+        points = f.points.read()
+        cells = {key: value.read() for key, value in f.cells.items()}
+        point_data = {name: value.read() for name, value in f.point_data.items()}
+        # Raw cell data is ordered like the cells below, so it can be handed to
+        # VTK as is.
+        cell_data = {name: value.read() for name, value in f.cell_data_raw.items()}
+        field_data = f.field_data
+
+    # Points
+    if points.shape[1] == 2:
+        points = np.column_stack([points, np.zeros(len(points))])
+    output.SetPoints(points)
+
+    # Cells
+    cell_types, offsets, connectivity = cell_arrays(cells, len(points))
+    if vtkVersion.GetVTKMajorVersion() >= 9:
+        # zero-copy offsets/connectivity layout
+        id_type = VTK_TYPE_INT32 if offsets.dtype == np.int32 else VTK_TYPE_INT64
+        cell_types = numpy_to_vtk(cell_types, deep=0, array_type=VTK_UNSIGNED_CHAR)
+        cell_array = vtkCellArray()
+        cell_array.SetData(
+            numpy_to_vtk(offsets, deep=0, array_type=id_type),
+            numpy_to_vtk(connectivity, deep=0, array_type=id_type),
         )
-        for name in celldata_names:
-            array = celldata_array(name)
-            output.CellData.append(array, name)
+        ugrid.SetCells(cell_types, cell_array)
+    else:
+        # dsa converts the numpy arrays itself
+        locations, legacy = legacy_cell_arrays(offsets, connectivity)
+        output.SetCells(cell_types, locations, legacy)
 
-        # Field data
-        for name, array in mesh.field_data.items():
-            output.FieldData.append(array, name)
+    for name, array in point_data.items():
+        output.PointData.append(array, name)
+    for name, array in cell_data.items():
+        output.CellData.append(array, name)
+    for name, array in field_data.items():
+        output.FieldData.append(array, name)
 
-        return 1
+    return ugrid
 
 
 @smproxy.writer(
@@ -156,19 +206,28 @@ class meshioWriter(VTKPythonAlgorithmBase):
         points = np.asarray(mesh.GetPoints())
 
         # Read cells
-        # Adapted from https://github.com/nschloe/meshio/blob/master/test/legacy_reader.py
-        cell_conn = mesh.GetCells()
-        cell_offsets = mesh.GetCellLocations()
-        cell_types = mesh.GetCellTypes()
+        ugrid = mesh.VTKObject
+        cell_types = np.asarray(mesh.GetCellTypes())
+        if vtkVersion.GetVTKMajorVersion() >= 9:
+            cell_array = ugrid.GetCells()
+            offsets = vtk_to_numpy(cell_array.GetOffsetsArray())
+            connectivity = vtk_to_numpy(cell_array.GetConnectivityArray())
+            starts = offsets[:-1]
+            sizes = np.diff(offsets)
+        else:
+            # legacy layout [n0, i0, i1, ..., n1, j0, ...]
+            connectivity = np.asarray(mesh.GetCells())
+            locations = np.asarray(mesh.GetCellLocations())
+            starts = locations + 1
+            sizes = connectivity[locations]
+        perm, bounds = group_by_type(cell_types)
         cells = {}
-        for vtk_cell_type in np.unique(cell_types):
-            offsets = cell_offsets[cell_types == vtk_cell_type]
-            ncells = len(offsets)
-            npoints = cell_conn[offsets[0]]
-            array = np.empty((ncells, npoints), dtype=int)
-            for i in range(npoints):
-                array[:, i] = cell_conn[offsets + i + 1]
-            cells[vtk_to_meshio_type[vtk_cell_type]] = array
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            idx = perm[start:stop]
+            meshio_type = vtk_to_meshio_type[cell_types[idx[0]]]
+            npoints = sizes[idx[0]]
+            # one gather for the whole block
+            cells[meshio_type] = connectivity[starts[idx][:, None] + np.arange(npoints)]
 
         # Read point and field data
         # Adapted from https://github.com/nschloe/meshio/blob/master/test/legacy_reader.py
@@ -183,24 +242,23 @@ class meshioWriter(VTKPythonAlgorithmBase):
         point_data = _read_data(mesh.GetPointData())
         field_data = _read_data(mesh.GetFieldData())
 
-        # Read cell data
-        cell_data_flattened = _read_data(mesh.GetCellData())
-        cell_data = {}
-        for cell_type in cells:
-            vtk_cell_type = meshio_to_vtk_type[cell_type]
-            mask_cell_type = cell_types == vtk_cell_type
-            cell_data[cell_type] = {}
-            for name, array in cell_data_flattened.items():
-                cell_data[cell_type][name] = array[mask_cell_type]
-
-        # Use meshio to write mesh
-        write_points_cells(
+        # Read cell data: apply the permutation once per array; the blocks are views
+        # into the permuted array.
+        cell_data = {cell_type: {} for cell_type in cells}
+        for name, array in _read_data(mesh.GetCellData()).items():
+            array = array[perm]
+            for cell_type, start, stop in zip(cells, bounds[:-1], bounds[1:]):
+                cell_data[cell_type][name] = array[start:stop]
+
+        write(
             self._filename,
-            points,
-            cells,
-            point_data=point_data,
-            cell_data=cell_data,
-            field_data=field_data,
+            meshio.Mesh(
+                points,
+                cells,
+                point_data=point_data,
+                cell_data=cell_data,
+                field_data=field_data,
+            ),
         )
 
         return 1
@@ -0,0 +1,122 @@
+import os
+import tempfile
+
+import numpy
+
+import hmf
+import meshio
+
+mesh = meshio.Mesh(
+    numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [2.0, 2.0]]),
+    {"triangle": numpy.array([[0, 1, 2], [0, 2, 3]])},
+    point_data={"a": numpy.arange(5.0)},
+)
+
+
+def test_info(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh)
+        hmf._cli.info([filename])
+        out = capsys.readouterr().out
+        assert "Number of points: 5" in out
+        assert "triangle: 2" in out
+        assert "deflate" in out
+        assert "ATTENTION" not in out
+
+        hmf._cli.info([filename, "--check"])
+        out = capsys.readouterr().out
+        assert "1 points are not part of any cell" in out
+
+
+def test_compress_uncompress():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filenames = [os.path.join(tmpdir, f"out{k}.hmf") for k in range(2)]
+        for filename in filenames:
+            hmf.write(filename, mesh, compression=None)
+
+        assert hmf._cli.compress(filenames + ["-c", "9", "-j", "1", "--float32"]) == 0
+        for filename in filenames:
+            with hmf.open(filename) as f:
+                assert [name for name, _ in f.points.filters] == ["shuffle", "deflate"]
+                assert f.points.attrs["GeometryType"] == "XY"
+                assert f.points.storage_dtype == numpy.float32
+                assert f.cells["triangle"].storage_dtype == numpy.uint8
+            out = hmf.read(filename)
+            assert numpy.all(out.points == mesh.points)
+            assert numpy.all(out.point_data["a"] == mesh.point_data["a"])
+
+        assert hmf._cli.uncompress(filenames) == 0
+        with hmf.open(filenames[0]) as f:
+            assert f.cells["triangle"].chunks is None
+            assert f.cells["triangle"].filters == []
+        out = hmf.read(filenames[0], mmap=True, restore_dtype=False)
+        assert isinstance(out.points, numpy.memmap)
+        assert out.points.dtype == numpy.float32
+        assert numpy.all(out.points == mesh.points)
+        assert numpy.all(out.point_data["a"] == mesh.point_data["a"])
+        assert sorted(os.listdir(tmpdir)) == ["out0.hmf", "out1.hmf"]
+
+        assert hmf._cli.compress([os.path.join(tmpdir, "missing.hmf")]) == 1
+
+
+def test_convert_streaming():
+    mesh3d = meshio.Mesh(
+        numpy.column_stack([mesh.points, numpy.zeros(5)]),
+        {"line": numpy.array([[3, 4]]), "triangle": mesh.cells["triangle"]},
+        point_data=mesh.point_data,
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        hmf_file = os.path.join(tmpdir, "in.hmf")
+        hmf.write(hmf_file, mesh3d)
+
+        # HMF to XDMF, with a mixed topology
+        xdmf_file = os.path.join(tmpdir, "out.xdmf")
+        hmf._cli.convert([hmf_file, xdmf_file, "-z"])
+        out = meshio.read(xdmf_file)
+        assert numpy.all(out.points == mesh.points)
+        assert numpy.all(out.cells["line"] == [[3, 4]])
+        assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+        assert numpy.all(out.point_data["a"] == mesh.point_data["a"])
+
+        # XDMF to HMF; mixed topologies take the full-mesh path
+        for cells in [{"triangle": mesh.cells["triangle"]}, mesh3d.cells]:
+            meshio.write(xdmf_file, meshio.Mesh(mesh3d.points, cells, mesh.point_data))
+            out_file = os.path.join(tmpdir, "out.hmf")
+            hmf._cli.convert([xdmf_file, out_file, "-z"])
+            out = hmf.read(out_file)
+            assert numpy.all(out.points == mesh.points)
+            assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+            assert numpy.all(out.point_data["a"] == mesh.point_data["a"])
+
+        # HMF to HMF
+        hmf._cli.convert([hmf_file, out_file, "-z", "--float32"])
+        with hmf.open(out_file) as f:
+            assert f.points.storage_dtype == numpy.float32
+            assert f.points.attrs["GeometryType"] == "XY"
+        out = hmf.read(out_file)
+        assert numpy.all(out.points == mesh.points)
+        assert numpy.all(out.cells["line"] == [[3, 4]])
+
+
+def test_convert_batch(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for k in range(3):
+            meshio.write(os.path.join(tmpdir, f"in{k}.vtu"), mesh)
+        with open(os.path.join(tmpdir, "bad.vtu"), "w") as f:
+            f.write("not a mesh")
+        outdir = os.path.join(tmpdir, "out")
+
+        args = [os.path.join(tmpdir, "in*.vtu"), "-d", outdir, "-j", "2"]
+        assert hmf._cli.convert(args) == 0
+        assert sorted(os.listdir(outdir)) == ["in0.hmf", "in1.hmf", "in2.hmf"]
+        out = hmf.read(os.path.join(outdir, "in1.hmf"))
+        assert numpy.all(out.points == mesh.points)
+        assert "Converted 3 files" in capsys.readouterr().out
+
+        args = [os.path.join(tmpdir, "*.vtu"), "-d", outdir, "-j", "1"]
+        assert hmf._cli.convert(args) == 1
+        out = capsys.readouterr().out
+        assert "bad.vtu" in out
+        assert "Converted 0 files" in out
+        assert "skipped 3 up to date, 1 failed" in out
@@ -1,9 +1,12 @@
 import os
 import tempfile
 
+import h5py
 import numpy
+import pytest
 
 import hmf
+import hmf._vtk
 import meshio
 
 tri_mesh_2d = meshio.Mesh(
@@ -24,5 +27,689 @@ def test_write_read():
         assert numpy.all(mesh.cells[key] == tri_mesh_2d.cells[key])
 
 
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"compression": None},
+        {"compression": None, "chunks": 64},
+        {"compression": "lzf", "shuffle": False},
+        {"compression": "gzip", "compression_opts": 9, "chunks": {"Topology": (1, 3)}},
+    ],
+)
+def test_storage_policy(kwargs):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, tri_mesh_2d, **kwargs)
+        mesh = hmf.read(filename)
+        with hmf.open(filename) as f:
+            chunks = f.cells["triangle"].chunks
+            filters = [name for name, _ in f.points.filters]
+
+    assert numpy.all(mesh.points == tri_mesh_2d.points)
+    assert numpy.all(mesh.cells["triangle"] == tri_mesh_2d.cells["triangle"])
+    if "chunks" in kwargs:
+        assert chunks == (2, 3) if kwargs["chunks"] == 64 else (1, 3)
+    elif kwargs["compression"] is None:
+        assert chunks is None
+    if kwargs["compression"] == "gzip":
+        assert filters == ["shuffle", "deflate"]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"shuffle": False}, {"compression": None}])
+def test_read_workers(kwargs, monkeypatch):
+    # threads are only used with several cores
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    chunk_maps = []
+
+    class ChunkMap(hmf._chunks.ChunkMap):
+        def __init__(self, dataset):
+            chunk_maps.append(dataset.name)
+            super().__init__(dataset)
+
+    monkeypatch.setattr(hmf._file, "ChunkMap", ChunkMap)
+
+    points = numpy.random.rand(1000, 3)
+    cells = numpy.random.randint(0, 1000, size=(700, 4))
+    mesh = meshio.Mesh(points, {"tetra": cells}, point_data={"a": points[:, 0]})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, chunks={"Geometry": (64, 3), "Topology": (50, 2)})
+        out = hmf.read(filename, workers=4)
+        chunk_maps.clear()
+        with hmf.open(filename, workers=4) as f:
+            rows = f.cells["tetra"][123:457]
+            more_rows = f.cells["tetra"][17:345]
+            one_chunk = f.cells["tetra"][100:150]
+            empty = f.points[10:5]
+
+    assert numpy.all(out.points == points)
+    assert numpy.all(out.cells["tetra"] == cells)
+    assert numpy.all(out.point_data["a"] == points[:, 0])
+    assert numpy.all(rows == cells[123:457])
+    assert numpy.all(more_rows == cells[17:345])
+    assert numpy.all(one_chunk == cells[100:150])
+    assert empty.shape == (0, 3)
+    # the chunks are listed once per dataset
+    assert chunk_maps == ["/domain/grid/Topology0"]
+
+
+def test_read_workers_fallback(monkeypatch):
+    mesh = meshio.Mesh(numpy.random.rand(1000, 3), {"line": numpy.zeros((10, 2))})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, chunks={"Geometry": (64, 3)})
+        with h5py.File(filename, "a") as f:
+            f.create_dataset(
+                "checked", data=mesh.points, chunks=(64, 3), fletcher32=True
+            )
+        with h5py.File(filename, "r") as f:
+            points = f["domain/grid/Geometry"]
+            monkeypatch.setattr(os, "cpu_count", lambda: 1)
+            assert not hmf._chunks.use_threads(points, 0, 1000, 4)
+            monkeypatch.setattr(os, "cpu_count", lambda: 4)
+            assert hmf._chunks.use_threads(points, 0, 1000, 4)
+            assert not hmf._chunks.use_threads(points, 0, 1000, 1)
+            assert not hmf._chunks.use_threads(points, 10, 60, 4)
+            # HDF5 verifies the checksums
+            assert not hmf._chunks.can_read_parallel(f["checked"])
+            assert hmf._chunks.can_read_parallel(points)
+            monkeypatch.delattr(os, "pread")
+            assert not hmf._chunks.can_read_parallel(points)
+
+
+def test_read_cache():
+    mesh = meshio.Mesh(
+        tri_mesh_2d.points,
+        tri_mesh_2d.cells,
+        point_data={"a": numpy.array([1.0, 2.0, 3.0, 4.0])},
+        cell_data={"triangle": {"b": numpy.array([5.0, 6.0])}},
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = hmf.ReadCache(os.path.join(tmpdir, "cache"), max_bytes=1000)
+        filenames = [os.path.join(tmpdir, f"out{k}.hmf") for k in range(2)]
+        for filename in filenames:
+            hmf.write(filename, mesh)
+
+        cold = hmf.read(filenames[0], cache=cache)
+        warm = hmf.read(filenames[0], cache=cache)
+        assert isinstance(warm.points, numpy.memmap)
+        with pytest.raises(ValueError):
+            hmf.read(filenames[0], cache=cache, mmap=True)
+        for out in [cold, warm]:
+            assert numpy.all(out.points == mesh.points)
+            assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+            assert numpy.all(out.point_data["a"] == mesh.point_data["a"])
+            assert numpy.all(out.cell_data["triangle"]["b"] == [5.0, 6.0])
+        # copy-on-write
+        warm.points[0] = 1.0
+        assert numpy.all(hmf.read(filenames[0], cache=cache).points == mesh.points)
+
+        # the least recently used entry is evicted
+        size = cache.size
+        hmf.read(filenames[1], cache=cache)
+        assert cache.size == size
+        cache.max_bytes = 10000
+        hmf.read(filenames[0], cache=cache)
+        assert cache.size == 2 * size
+
+        # a changed file gets a new entry
+        hmf.write(filenames[1], meshio.Mesh(mesh.points[:3], {"line": [[0, 1]]}))
+        out = hmf.read(filenames[1], cache=cache)
+        assert len(out.points) == 3
+
+        cache.clear()
+        assert cache.size == 0
+
+
+def test_attributes():
+    point_data = {f"p{k}": numpy.arange(4.0) + k for k in range(12)}
+    point_data["v"] = numpy.ones((4, 3), dtype=numpy.int32)
+    cell_data = {"triangle": {"a": numpy.array([1.0, 2.0]), "b": numpy.zeros(2)}}
+    mesh = meshio.Mesh(tri_mesh_2d.points, tri_mesh_2d.cells, point_data, cell_data)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh)
+
+        out = hmf.read(filename)
+        assert list(out.point_data) == list(point_data)
+        for name, values in point_data.items():
+            assert numpy.all(out.point_data[name] == values)
+        assert numpy.all(out.cell_data["triangle"]["a"] == [1.0, 2.0])
+        out = hmf.read(filename, point_data=["p11"], cell_data=["b"])
+        assert list(out.point_data) == ["p11"]
+
+        with h5py.File(filename, "r") as f:
+            index = hmf._attributes.read_index(f["domain/grid/Attributes"])
+        assert index[12] == ("v", "Node", "Attribute12", (4, 3), numpy.int32)
+        assert index[14][:2] == ("b", "Cell")
+
+        # older files have a single Attribute dataset next to the Topology
+        with h5py.File(filename, "a") as f:
+            grid = f["domain/grid"]
+            del grid["Attributes"]
+            grid["Attribute"] = numpy.arange(4.0)
+            grid["Attribute"].attrs["Name"] = "old"
+            grid["Attribute"].attrs["Center"] = "Node"
+        out = hmf.read(filename)
+        assert list(out.point_data) == ["old"]
+        assert numpy.all(out.point_data["old"] == numpy.arange(4.0))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_grids(max_workers):
+    line_mesh = meshio.Mesh(
+        numpy.array([[0.0, 0.0, 1.0], [2.0, 1.0, 1.0]]),
+        {"line": numpy.array([[0, 1]])},
+        point_data={"a": numpy.array([1.0, 2.0])},
+    )
+    meshes = {"part0": tri_mesh_2d, "part1": line_mesh, "solid/part0": line_mesh}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write_grids(filename, meshes)
+
+        grids = hmf.list_grids(filename)
+        assert [g.name for g in grids] == [
+            "domain/part0",
+            "domain/part1",
+            "solid/part0",
+        ]
+        assert [g.num_points for g in grids] == [4, 2, 2]
+        assert [g.num_cells for g in grids] == [2, 1, 1]
+        assert numpy.all(grids[0].upper == [1 / 3, 1 / 3, 0.0])
+        assert numpy.all(grids[1].lower == [0.0, 0.0, 1.0])
+
+        with pytest.raises(ValueError):
+            hmf.read(filename)
+        mesh = hmf.read(filename, grid="part1")
+        assert numpy.all(mesh.point_data["a"] == [1.0, 2.0])
+
+        out = hmf.read_grids(filename, max_workers=max_workers)
+        assert list(out) == [g.name for g in grids]
+        assert numpy.all(out["domain/part0"].points == tri_mesh_2d.points)
+        assert numpy.all(out["solid/part0"].cells["line"] == [[0, 1]])
+        out = hmf.read_grids(filename, ["solid/part0"], max_workers=max_workers)
+        assert list(out) == ["solid/part0"]
+
+        # files without a directory, e.g., from StreamWriter
+        hmf.write(filename, tri_mesh_2d)
+        with h5py.File(filename, "a") as f:
+            del f["Grids"]
+        grids = hmf.list_grids(filename)
+        assert [g.name for g in grids] == ["domain/grid"]
+        assert numpy.all(grids[0].upper == [1 / 3, 1 / 3, 0.0])
+
+
+def test_read_region():
+    n = 30
+    x, y = numpy.meshgrid(numpy.linspace(0, 1, n), numpy.linspace(0, 1, n))
+    points = numpy.column_stack([x.ravel(), y.ravel()])
+    i = (numpy.arange(n - 1)[:, None] * n + numpy.arange(n - 1)).ravel()
+    cells = numpy.concatenate(
+        [
+            numpy.column_stack([i, i + 1, i + n]),
+            numpy.column_stack([i + 1, i + n + 1, i + n]),
+        ]
+    )
+    mesh = meshio.Mesh(
+        points,
+        {"triangle": cells},
+        point_data={"x": points[:, 0]},
+        cell_data={"triangle": {"c": points[cells].mean(axis=1)[:, 1]}},
+    )
+    lower, upper = [0.2, 0.5, -1.0], [0.3, 0.55, 1.0]
+
+    # cells with a bounding box that overlaps the region, by their centroids
+    c = points[cells]
+    is_inside = numpy.all(
+        (c.max(axis=1) >= lower[:2]) & (c.min(axis=1) <= upper[:2]), 1
+    )
+    expected = c[is_inside].mean(axis=1)
+    expected = expected[numpy.lexsort(expected.T)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        for spatial_index in [16, False]:
+            hmf.write(filename, mesh, spatial_index=spatial_index)
+            out = hmf.read_region(filename, (lower, upper))
+            centroids = out.points[out.cells["triangle"]].mean(axis=1)
+            assert numpy.allclose(centroids[numpy.lexsort(centroids.T)], expected)
+            assert len(out.points) == len(numpy.unique(out.cells["triangle"]))
+            assert numpy.all(out.point_data["x"] == out.points[:, 0])
+            assert numpy.allclose(out.cell_data["triangle"]["c"], centroids[:, 1])
+
+        hmf.write(filename, mesh, spatial_index=16)
+        with h5py.File(filename, "r") as f:
+            assert f["domain/grid/SpatialIndex/Buckets0"].shape == (106, 2, 2)
+        out = hmf.read_region(filename, ([5.0, 5.0], [6.0, 6.0]))
+        assert len(out.points) == 0
+        assert out.points.shape == (0, 2)
+        with pytest.raises(ValueError, match="coordinates"):
+            hmf.read_region(filename, ([0.0], [1.0]))
+
+        # no cells at all
+        hmf.write(filename, meshio.Mesh(points, {"triangle": cells[:0]}))
+        out = hmf.read_region(filename, (lower, upper))
+        assert len(out.points) == 0
+
+
+def test_lod():
+    n = 17
+    x, y = numpy.meshgrid(numpy.linspace(0, 1, n), numpy.linspace(0, 1, n))
+    points = numpy.column_stack([x.ravel(), y.ravel()])
+    i = (numpy.arange(n - 1)[:, None] * n + numpy.arange(n - 1)).ravel()
+    cells = numpy.concatenate(
+        [
+            numpy.column_stack([i, i + 1, i + n]),
+            numpy.column_stack([i + 1, i + n + 1, i + n]),
+        ]
+    )
+    mesh = meshio.Mesh(
+        points,
+        {"triangle": cells},
+        point_data={"x": points[:, 0]},
+        cell_data={"triangle": {"c": numpy.arange(len(cells), dtype=float)}},
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, lod=2)
+        with hmf.open(filename) as f:
+            assert f.levels == 3
+
+        num_points = [len(points)]
+        for level in [1, 2]:
+            out = hmf.read(filename, level=level)
+            num_points.append(len(out.points))
+            # averaged like the points
+            assert numpy.allclose(out.point_data["x"], out.points[:, 0])
+            triangles = out.cells["triangle"]
+            assert triangles.max() < len(out.points)
+            assert numpy.all(numpy.diff(numpy.sort(triangles, axis=1), axis=1) > 0)
+            assert len(out.cell_data["triangle"]["c"]) == len(triangles)
+        assert num_points[0] > 3 * num_points[1] > 9 * num_points[2]
+
+        with pytest.raises(ValueError):
+            hmf.read(filename, level=3)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"encoding": "predictive"},
+        {"encoding": "predictive", "float_dtype": "float32", "compression": None},
+        {"encoding": "quantize", "tolerance": 1.0e-3, "chunks": 64},
+        {"encoding": "quantize", "tolerance": {"Attribute": 1.0e-3}, "chunks": 64},
+    ],
+)
+def test_encoding(kwargs):
+    t = numpy.linspace(0.0, 1.0, 500)
+    points = numpy.column_stack([numpy.cos(t), numpy.sin(t), t**2])
+    cells = numpy.column_stack([numpy.arange(499), numpy.arange(1, 500)])
+    point_data = {"u": numpy.exp(t), "i": numpy.arange(500, dtype=numpy.int32) ** 2}
+    mesh = meshio.Mesh(points, {"line": cells}, point_data=point_data)
+    tol = kwargs.get("tolerance", 0.0)
+    if isinstance(tol, dict):
+        tol = tol["Attribute"]
+    if "float_dtype" in kwargs:
+        tol = 1.0e-6
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, **kwargs)
+        with h5py.File(filename, "r") as f:
+            geo = f["domain/grid/Geometry"]
+            assert geo.attrs["Encoding"] in ["xor", "quantize"]
+
+        out = hmf.read(filename)
+        assert numpy.all(out.cells["line"] == cells)
+        assert numpy.abs(out.points - points).max() <= tol + 1.0e-12
+        assert numpy.abs(out.point_data["u"] - point_data["u"]).max() <= tol + 1.0e-12
+        assert out.points.dtype == float
+        # integers are always lossless
+        assert numpy.all(out.point_data["i"] == point_data["i"])
+
+        # slices that start in the middle of an encoding block
+        for read_kwargs in [{}, {"workers": 2}, {"mmap": True}]:
+            with hmf.open(filename, **read_kwargs) as f:
+                assert numpy.all(f.points[100:300] == out.points[100:300])
+                assert numpy.all(f.points[77, 1] == out.points[77, 1])
+                assert numpy.all(f.point_data["u"][450:] == out.point_data["u"][450:])
+
+
+@pytest.mark.parametrize("encoding", ["predictive", "quantize"])
+def test_encoding_auto_chunks(encoding):
+    # h5py picks the chunk shape; the default encoding block is used
+    points = numpy.random.rand(1000, 3)
+    mesh = meshio.Mesh(points, {"line": numpy.array([[0, 1], [1, 2]])})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, encoding=encoding, tolerance=1.0e-6, chunks=True)
+        out = hmf.read(filename)
+
+        with pytest.raises(ValueError):
+            hmf.write(filename, mesh, encoding="quantize", tolerance=0.0)
+        with pytest.raises(ValueError):
+            hmf.write(filename, mesh, encoding="quantize", tolerance={"Geometry": -1.0})
+    assert numpy.allclose(out.points, points, atol=1.0e-6, rtol=0.0)
+
+
+def test_encoding_wide_range():
+    # too many multiples of the tolerance for int64; stored losslessly instead
+    points = numpy.array([[0.0, 0.0], [1.0e300, 1.0], [-1.0e300, 2.0]])
+    mesh = meshio.Mesh(points, {"line": numpy.array([[0, 1], [1, 2]])})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, encoding="quantize", tolerance=1.0e-10)
+        with h5py.File(filename, "r") as f:
+            assert f["domain/grid/Geometry"].attrs["Encoding"] == "xor"
+        assert numpy.all(hmf.read(filename).points == points)
+
+
+@pytest.mark.parametrize("float_dtype", [None, "float32"])
+def test_dtypes(float_dtype):
+    points = numpy.random.rand(300, 2)
+    cells = numpy.array([[0, 1, 299], [0, 2, 3]])
+    mesh = meshio.Mesh(points, {"triangle": cells}, point_data={"a": points[:, 0]})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, float_dtype=float_dtype)
+        out = hmf.read(filename)
+        compact = hmf.read(filename, restore_dtype=False)
+        with hmf.open(filename) as f:
+            assert f.cells["triangle"].storage_dtype == numpy.uint16
+            assert f.cells["triangle"].dtype == cells.dtype
+
+        hmf.repack(filename, index_dtype=None, float_dtype="float32")
+        repacked = hmf.read(filename)
+
+    assert out.cells["triangle"].dtype == cells.dtype
+    assert compact.cells["triangle"].dtype == numpy.uint16
+    assert numpy.all(out.cells["triangle"] == cells)
+    assert out.points.dtype == numpy.float64
+    if float_dtype is None:
+        assert compact.points.dtype == numpy.float64
+        assert numpy.all(out.points == points)
+    else:
+        assert compact.points.dtype == numpy.float32
+        assert numpy.allclose(out.points, points, rtol=1.0e-6)
+        assert numpy.allclose(out.point_data["a"], points[:, 0], rtol=1.0e-6)
+    assert repacked.points.dtype == numpy.float64
+    assert repacked.cells["triangle"].dtype == cells.dtype
+
+
+def test_mmap_compact_dtypes():
+    # uint8 connectivity stays memory-mapped unless the type is restored
+    mesh = meshio.Mesh(tri_mesh_2d.points, tri_mesh_2d.cells)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, compression=None, shuffle=False)
+        out = hmf.read(filename, mmap=True)
+        restored = hmf.read(filename, mmap=True, restore_dtype=True)
+
+    assert isinstance(out.cells["triangle"], numpy.memmap)
+    assert out.cells["triangle"].dtype == numpy.uint8
+    assert not isinstance(restored.cells["triangle"], numpy.memmap)
+    assert restored.cells["triangle"].dtype == mesh.cells["triangle"].dtype
+    assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+
+
+def test_index_dtype_range():
+    # 300 points don't fit into uint8 indices
+    points = numpy.random.rand(300, 2)
+    cells = numpy.array([[0, 1, 2], [0, 2, 3]])
+    mesh = meshio.Mesh(points, {"triangle": cells})
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        with pytest.raises(ValueError):
+            hmf.write(filename, mesh, index_dtype="uint8")
+
+        hmf.write(filename, mesh, index_dtype="uint16")
+        with pytest.raises(ValueError):
+            hmf.repack(filename, index_dtype="uint8")
+        assert numpy.all(hmf.read(filename).cells["triangle"] == cells)
+
+
+@pytest.mark.parametrize("curve", ["hilbert", "morton"])
+def test_reorder(curve):
+    points = numpy.random.rand(100, 3)
+    cells = numpy.random.randint(0, 100, size=(50, 4))
+    mesh = meshio.Mesh(
+        points,
+        {"tetra": cells},
+        cell_data={"tetra": {"c": numpy.arange(50.0)}},
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, reorder=curve, store_permutation=True)
+        out = hmf.read(filename)
+        with hmf.open(filename) as f:
+            point_perm = f._grid["Permutation/Points"][()]
+            cell_perm = f._grid["Permutation/Cells0"][()]
+
+        # a typo leaves the existing file alone
+        with pytest.raises(ValueError):
+            hmf.write(filename, mesh, reorder=curve[:-1])
+        assert numpy.all(hmf.read(filename).points == out.points)
+
+    assert numpy.all(out.points == points[point_perm])
+    assert numpy.all(out.cell_data["tetra"]["c"] == cell_perm)
+    # same cells in the original numbering
+    assert numpy.all(point_perm[out.cells["tetra"]] == cells[cell_perm])
+
+    # neighbors on the curve are neighbors in space
+    grid = numpy.stack(numpy.meshgrid(*3 * [numpy.arange(8.0)]), axis=-1)
+    mesh, _, _ = hmf.reorder(meshio.Mesh(grid.reshape(-1, 3), {}), curve)
+    steps = numpy.abs(numpy.diff(mesh.points, axis=0)).sum(axis=1)
+    if curve == "hilbert":
+        assert numpy.all(steps == 1)
+    # both curves fill one octant after another
+    assert numpy.all(mesh.points[:64] < 4)
+
+
+def test_open():
+    mesh = meshio.Mesh(
+        tri_mesh_2d.points,
+        tri_mesh_2d.cells,
+        point_data={"a": numpy.array([1.0, 2.0, 3.0, 4.0])},
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh)
+        with hmf.open(filename) as f:
+            assert f.num_points == 4
+            assert f.num_cells == {"triangle": 2}
+            assert f.points.shape == (4, 2)
+            assert isinstance(f.cells["triangle"], hmf.LazyArray)
+            assert numpy.all(f.cells["triangle"][1] == [0, 2, 3])
+            assert numpy.all(numpy.asarray(f.point_data["a"]) == mesh.point_data["a"])
+
+
+def test_read_selection():
+    mesh = meshio.Mesh(
+        numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [2.0, 0.0]]),
+        {
+            "line": numpy.array([[0, 1], [1, 4]]),
+            "triangle": numpy.array([[0, 1, 2], [0, 2, 3], [1, 4, 2]]),
+        },
+        cell_data={
+            "line": {"c": numpy.array([0.0, 1.0])},
+            "triangle": {"c": numpy.array([2.0, 3.0, 4.0])},
+        },
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh)
+
+        out = hmf.read(filename, cell_types=["triangle"], cell_data=[])
+        assert list(out.cells) == ["triangle"]
+        assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+        assert out.cell_data["triangle"] == {}
+
+        out = hmf.read(filename, cell_range=(1, 4))
+        assert numpy.all(out.cells["line"] == [[1, 4]])
+        assert numpy.all(out.cells["triangle"] == [[0, 1, 2], [0, 2, 3]])
+        assert numpy.all(out.cell_data["line"]["c"] == [1.0])
+        assert numpy.all(out.cell_data["triangle"]["c"] == [2.0, 3.0])
+
+        out = hmf.read(filename, cell_types=["triangle"], point_range=(1, 5))
+        assert len(out.points) == 4
+        assert numpy.all(out.cells["triangle"] == [[0, 3, 1]])
+        assert numpy.all(out.cell_data["triangle"]["c"] == [4.0])
+
+
+def test_time_series():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        with hmf.TimeSeriesWriter(filename) as writer:
+            writer.write_points_cells(tri_mesh_2d.points, tri_mesh_2d.cells)
+            for t in [0.0, 0.5, 1.0]:
+                writer.write_data(
+                    t,
+                    point_data={"u": numpy.full(4, t), "u/x": numpy.arange(4.0)},
+                    cell_data={"triangle": {"c": numpy.array([t, -t])}},
+                )
+                # invalid steps are rejected without breaking the writer
+                with pytest.raises(ValueError):
+                    writer.write_data(
+                        t,
+                        point_data={"u": numpy.zeros(4)},
+                        cell_data={"triangle": {"u": numpy.zeros(2)}},
+                    )
+                with pytest.raises(ValueError):
+                    writer.write_data(t, point_data={"u": numpy.zeros(3)})
+
+        # a time series file is also a regular mesh file
+        mesh = hmf.read(filename)
+        assert numpy.all(mesh.cells["triangle"] == tri_mesh_2d.cells["triangle"])
+
+        with hmf.TimeSeriesReader(filename) as reader:
+            points, cells = reader.read_points_cells()
+            assert numpy.all(points == tri_mesh_2d.points)
+            assert reader.num_steps == 3
+            t, point_data, cell_data = reader.read_data(1)
+            assert t == 0.5
+            assert numpy.all(point_data["u"] == 0.5)
+            assert numpy.all(point_data["u/x"] == numpy.arange(4.0))
+            assert numpy.all(cell_data["triangle"]["c"] == [0.5, -0.5])
+
+
+def test_stream_writer():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        with hmf.StreamWriter(filename, chunks=16) as writer:
+            writer.append_points(numpy.array([[0.0, 0.0], [1.0, 0.0]]))
+            writer.append_cells("triangle", numpy.array([[0, 1, 2]]))
+            writer.append_data("c", numpy.array([1.0]), cell_type="triangle")
+            writer.append_data("a", numpy.array([0.0, 1.0]))
+            writer.append_data("b", numpy.array([[0, 0], [1, 1]]))
+            writer.append_points(numpy.array([[1.0, 1.0], [0.0, 1.0]]))
+            writer.append_data("b", numpy.array([[2, 2], [3, 3]]))
+            writer.append_data("a", numpy.array([2.0, 3.0]))
+            writer.append_cells("line", numpy.array([[0, 1]]))
+            writer.append_data("c", numpy.array([3.0]), cell_type="line")
+            writer.append_cells("triangle", numpy.array([[0, 2, 3]]))
+            writer.append_data("c", numpy.array([2.0]), cell_type="triangle")
+        assert os.listdir(tmpdir) == ["out.hmf"]
+
+        mesh = hmf.read(filename)
+        assert numpy.all(mesh.points == tri_mesh_2d.points * 3)
+        assert numpy.all(mesh.cells["triangle"] == tri_mesh_2d.cells["triangle"])
+        assert numpy.all(mesh.cells["line"] == [[0, 1]])
+        assert numpy.all(mesh.cell_data["triangle"]["c"] == [1.0, 2.0])
+        assert numpy.all(mesh.cell_data["line"]["c"] == [3.0])
+        assert numpy.all(mesh.point_data["a"] == numpy.arange(4.0))
+        assert numpy.all(mesh.point_data["b"][:, 1] == numpy.arange(4))
+
+        # uncompressed, the appendable datasets become contiguous
+        hmf.repack(filename, compression=None, shuffle=False, chunks=False)
+        mesh = hmf.read(filename, mmap=True)
+        assert isinstance(mesh.points, numpy.memmap)
+        assert isinstance(mesh.cells["triangle"], numpy.memmap)
+        assert numpy.all(mesh.points == tri_mesh_2d.points * 3)
+
+        with pytest.raises(ValueError):
+            with hmf.StreamWriter(filename) as writer:
+                writer.append_points(tri_mesh_2d.points)
+                writer.append_data("a", numpy.zeros(3))
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter(prefetch):
+    cells = numpy.arange(30).reshape(10, 3)
+    mesh = meshio.Mesh(
+        numpy.zeros((30, 2)),
+        {"line": numpy.array([[0, 1]]), "triangle": cells},
+        cell_data={
+            "line": {"c": numpy.array([-1.0])},
+            "triangle": {"c": numpy.arange(10.0)},
+        },
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, mesh, chunks=48, index_dtype=None)
+
+        batches = list(hmf.iter_cells(filename, "triangle", prefetch=prefetch))
+        assert [len(b) for b in batches] == [2, 2, 2, 2, 2]
+        assert numpy.all(numpy.concatenate(batches) == cells)
+
+        batches = hmf.iter_cell_data(filename, "c", "triangle", 4, prefetch=prefetch)
+        assert [list(b) for b in batches] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+        # stop early
+        for batch in hmf.iter_cells(filename, "triangle", 1, prefetch=prefetch):
+            break
+
+
+def test_validate():
+    points = numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [1.0, 1.0]])
+    points[3, 1] = numpy.nan
+    cells = {"triangle": numpy.array([[0, 1, 2], [0, 2, 5]])}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, "out.hmf")
+        hmf.write(filename, meshio.Mesh(points, cells))
+
+        report = hmf.validate(filename, max_workers=1)
+        assert not report.is_valid
+        assert report.out_of_range_indices["triangle"] == 1
+        assert report.negative_indices["triangle"] == 0
+        assert report.orphaned_points == 2
+        assert report.duplicate_points is None
+        assert report.non_finite["/domain/grid/Geometry"] == 1
+
+        report = hmf.validate(filename, duplicate_tol=1.0e-10, max_workers=2)
+        assert report.duplicate_points == 1
+
+        hmf.write(filename, tri_mesh_2d)
+        assert hmf.validate(filename, duplicate_tol=0.0, max_workers=1).is_valid
+
+        # float32 points, native or stored with float_dtype
+        points = numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+        cells = {"triangle": numpy.array([[0, 1, 2]])}
+        for p, float_dtype in [(points.astype(numpy.float32), None), (points, "f4")]:
+            hmf.write(filename, meshio.Mesh(p, cells), float_dtype=float_dtype)
+            report = hmf.validate(filename, duplicate_tol=0.0, max_workers=1)
+            assert report.duplicate_points == 1
+
+
 if __name__ == "__main__":
     test_write_read()
+
+
+def test_vtk_cell_arrays():
+    cells = {
+        "triangle": numpy.array([[0, 1, 2], [1, 3, 2]]),
+        "line": numpy.array([[0, 1]]),
+        "quad": numpy.array([[0, 1, 3, 2]]),
+    }
+    cell_types, offsets, connectivity = hmf._vtk.cell_arrays(cells, 4)
+    assert list(cell_types) == [5, 5, 3, 9]
+    assert list(offsets) == [0, 3, 6, 8, 12]
+    assert list(connectivity) == [0, 1, 2, 1, 3, 2, 0, 1, 0, 1, 3, 2]
+    assert offsets.dtype == numpy.int32
+
+    locations, legacy = hmf._vtk.legacy_cell_arrays(offsets, connectivity)
+    assert list(locations) == [0, 4, 8, 11]
+    assert list(legacy) == [3, 0, 1, 2, 3, 1, 3, 2, 2, 0, 1, 4, 0, 1, 3, 2]
+
+    # as VTK may order them, with the types interleaved
+    perm, bounds = hmf._vtk.group_by_type(numpy.array([5, 3, 5, 9, 3]))
+    assert list(perm) == [1, 4, 0, 2, 3]
+    assert list(bounds) == [0, 2, 4, 5]
@@ -0,0 +1,52 @@
+# Run with
+#
+#     mpirun -n 4 python3 -m pytest test/test_mpi.py
+#
+import os
+import tempfile
+
+import h5py
+import numpy
+import pytest
+
+import hmf
+import meshio
+
+MPI = pytest.importorskip("mpi4py.MPI")
+
+pytestmark = pytest.mark.skipif(
+    not h5py.get_config().mpi, reason="h5py without MPI support"
+)
+
+
+def _local_mesh(rank):
+    # a strip of two triangles per rank, shifted by the rank
+    points = numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    points[:, 0] += rank
+    return meshio.Mesh(
+        points,
+        {"triangle": numpy.array([[0, 1, 2], [0, 2, 3]])},
+        point_data={"rank": numpy.full(4, float(rank))},
+    )
+
+
+def test_write_read_parallel():
+    comm = MPI.COMM_WORLD
+    tmpdir = comm.bcast(tempfile.mkdtemp() if comm.rank == 0 else None)
+    filename = os.path.join(tmpdir, "out.hmf")
+
+    mesh = _local_mesh(comm.rank)
+    hmf.write_parallel(filename, mesh, comm)
+
+    out = hmf.read_parallel(filename, comm)
+    assert numpy.all(out.points == mesh.points)
+    assert numpy.all(out.cells["triangle"] == mesh.cells["triangle"])
+    assert numpy.all(out.point_data["rank"] == comm.rank)
+
+    comm.Barrier()
+    if comm.rank == 0:
+        full = hmf.read(filename)
+        assert len(full.points) == 4 * comm.size
+        assert numpy.all(full.cells["triangle"][-1] == [0, 2, 3] + 4 * (comm.size - 1))
+        os.remove(filename)
+        os.rmdir(tmpdir)